@@ -0,0 +1,43 @@
+from normalize import GAGNE, PERDU, EN_ATTENTE, OUTCOMES, normalize_couleur, normalize_statut
+
+# Agrégats tenus à jour à l'ingestion : {portée: {clé: {résultat: n}}}
+SCOPES = ('total', 'couleur', 'jour')
+
+def empty_aggregates():
+    return {scope: {} for scope in SCOPES}
+
+def prediction_keys(p):
+    """Clés (portée, clé, résultat) incrémentées par une prédiction"""
+    outcome = p.get('outcome') or normalize_statut(p['statut'])
+    couleur = p.get('couleur_norm') or normalize_couleur(p['couleur'])
+    jour = str(p['date'])[:10]
+    return [('total', '', outcome), ('couleur', couleur, outcome), ('jour', jour, outcome)]
+
+def add_to_aggregates(agg, p, n=1):
+    for scope, key, outcome in prediction_keys(p):
+        counts = agg[scope].setdefault(key, {})
+        counts[outcome] = counts.get(outcome, 0) + n
+        if counts[outcome] <= 0:
+            del counts[outcome]
+            if not counts:
+                del agg[scope][key]
+
+def _summary(counts):
+    gagnes = counts.get(GAGNE, 0)
+    perdus = counts.get(PERDU, 0)
+    termines = gagnes + perdus
+    return {
+        'total': sum(counts.get(o, 0) for o in OUTCOMES),
+        'gagnes': gagnes,
+        'perdus': perdus,
+        'en_attente': counts.get(EN_ATTENTE, 0),
+        # Taux sur les prédictions terminées uniquement
+        'taux': round(gagnes / termines * 100, 1) if termines else None
+    }
+
+def summarize(agg):
+    """Vue publique de get_stats() à partir des agrégats"""
+    stats = _summary(agg['total'].get('', {}))
+    stats['couleurs'] = {k: _summary(v) for k, v in sorted(agg['couleur'].items())}
+    stats['jours'] = {k: _summary(v) for k, v in sorted(agg['jour'].items())}
+    return stats
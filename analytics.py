@@ -0,0 +1,156 @@
+import numpy as np
+from normalize import GAGNE, PERDU
+from storage import get_columns, data_version
+from snapshot import open_snapshot, NO_TS
+
+# Analyse en une passe vectorisée sur des colonnes compactes
+NUMERO_BUCKET = 100
+ROLLING_WINDOWS = (50, 200)
+
+def _snapshot_arrays(snap, filters):
+    """Tableaux lus directement dans l'instantané mappé, sans passer par des dicts"""
+    lut = np.array(
+        [1 if o == GAGNE else 0 if o == PERDU else -1 for o in snap.dictionaries['outcome']],
+        dtype=np.int8
+    )
+    ts = snap.column('ts', filters)
+    hour = np.where(ts != NO_TS, ts // 3600 % 24, -1).astype(np.int8)
+    return {
+        'result': lut[snap.column('outcome', filters)],
+        'couleur': snap.column('couleur_norm', filters).astype(np.int16),
+        'couleurs': np.array(snap.dictionaries['couleur_norm'], dtype=str),
+        'numero': snap.column('numero', filters).astype(np.int32),
+        'hour': hour,
+    }
+
+def load_arrays(filters=None, channel=None):
+    """Colonnes converties en tableaux numpy (ordre chronologique).
+
+    L'instantané de la dernière sync est utilisé tant qu'il correspond au stockage.
+    """
+    snap = open_snapshot(channel)
+    if snap is not None and snap.matches(data_version(channel)):
+        return _snapshot_arrays(snap, filters)
+
+    cols = get_columns(('numero', 'couleur_norm', 'outcome', 'date'), filters, channel)
+    n = len(cols['outcome'])
+
+    outcome = np.array(cols['outcome'], dtype='U7')
+    # 1 = gagné, 0 = perdu, -1 = en attente
+    result = np.full(n, -1, dtype=np.int8)
+    result[outcome == GAGNE] = 1
+    result[outcome == PERDU] = 0
+
+    couleurs, couleur_codes = np.unique(np.array(cols['couleur_norm'], dtype=str), return_inverse=True)
+
+    numeros = np.array(cols['numero'], dtype='U10')
+    numero = np.full(n, -1, dtype=np.int32)
+    digits = np.char.isdigit(numeros)
+    numero[digits] = numeros[digits].astype(np.int32)
+
+    # Heure (UTC) = caractères 11-12 de la date ISO, lus comme codes unicode
+    dates = np.array(cols['date'], dtype='U13')
+    hour = np.full(n, -1, dtype=np.int8)
+    if n:
+        chars = dates.view(np.uint32).reshape(n, 13).astype(np.int32) - ord('0')
+        tens, units = chars[:, 11], chars[:, 12]
+        ok = (tens >= 0) & (tens <= 2) & (units >= 0) & (units <= 9)
+        hour[ok] = (tens[ok] * 10 + units[ok]).astype(np.int8)
+
+    return {
+        'result': result,
+        'couleur': couleur_codes.astype(np.int16),
+        'couleurs': couleurs,
+        'numero': numero,
+        'hour': hour,
+    }
+
+def _rates(keys, wins, size):
+    """(gagnés, terminés) par clé via bincount"""
+    played = np.bincount(keys, minlength=size)
+    won = np.bincount(keys, weights=wins, minlength=size).astype(np.int64)
+    return won, played
+
+def _rate_table(labels, won, played):
+    return {
+        label: {'gagnes': int(w), 'termines': int(p), 'taux': round(w / p * 100, 1)}
+        for label, w, p in zip(labels, won, played) if p
+    }
+
+def _longest_run(wins, value):
+    """Plus longue série consécutive de `value` dans un tableau 0/1"""
+    if not len(wins):
+        return 0
+    edges = np.flatnonzero(np.diff(wins)) + 1
+    starts = np.concatenate(([0], edges))
+    lengths = np.diff(np.concatenate((starts, [len(wins)])))
+    runs = lengths[wins[starts] == value]
+    return int(runs.max()) if len(runs) else 0
+
+def _rolling(wins, window):
+    """Taux glissant sur `window` prédictions : dernier, min et max"""
+    if len(wins) < window:
+        return None
+    csum = np.concatenate(([0], np.cumsum(wins, dtype=np.int64)))
+    rates = (csum[window:] - csum[:-window]) / window * 100
+    return {
+        'actuel': round(float(rates[-1]), 1),
+        'min': round(float(rates.min()), 1),
+        'max': round(float(rates.max()), 1),
+    }
+
+def analyse(filters=None, arrays=None, channel=None):
+    """Calcule toutes les métriques d'analyse en une passe"""
+    a = arrays if arrays is not None else load_arrays(filters, channel)
+    done = a['result'] >= 0
+    wins = a['result'][done].astype(np.int8)
+
+    won, played = _rates(a['couleur'][done], wins, len(a['couleurs']))
+    par_couleur = _rate_table([str(c) for c in a['couleurs']], won, played)
+
+    numeros = a['numero'][done]
+    known = numeros >= 0
+    buckets = numeros[known] // NUMERO_BUCKET
+    size = int(buckets.max()) + 1 if len(buckets) else 0
+    won, played = _rates(buckets, wins[known], size)
+    labels = [f"{b * NUMERO_BUCKET}-{(b + 1) * NUMERO_BUCKET - 1}" for b in range(size)]
+    par_numero = _rate_table(labels, won, played)
+
+    hours = a['hour'][done]
+    known = hours >= 0
+    won, played = _rates(hours[known].astype(np.int64), wins[known], 24)
+    par_heure = _rate_table([f"{h:02d}h" for h in range(24)], won, played)
+
+    total_won = int(wins.sum())
+    return {
+        'total': int(len(a['result'])),
+        'termines': int(len(wins)),
+        'gagnes': total_won,
+        'taux': round(total_won / len(wins) * 100, 1) if len(wins) else None,
+        'serie_gagnante': _longest_run(wins, 1),
+        'serie_perdante': _longest_run(wins, 0),
+        'glissant': {w: _rolling(wins, w) for w in ROLLING_WINDOWS},
+        'par_couleur': par_couleur,
+        'par_numero': par_numero,
+        'par_heure': par_heure,
+    }
+
+def format_analysis(r):
+    """Lignes de texte pour Telegram et le PDF"""
+    lines = [
+        f"Prédictions: {r['total']} (terminées: {r['termines']})",
+        f"Taux global: {r['taux']}%" if r['taux'] is not None else "Taux global: N/A",
+        f"Plus longue série gagnante: {r['serie_gagnante']}",
+        f"Plus longue série perdante: {r['serie_perdante']}",
+    ]
+    for window, roll in r['glissant'].items():
+        if roll:
+            lines.append(
+                f"Taux glissant {window}: {roll['actuel']}% (min {roll['min']}%, max {roll['max']}%)"
+            )
+    for title, key in (('Par couleur', 'par_couleur'), ('Par numéro', 'par_numero'), ('Par heure (UTC)', 'par_heure')):
+        if r[key]:
+            lines.append(f"{title}:")
+            for label, v in r[key].items():
+                lines.append(f"  {label}: {v['taux']}% ({v['gagnes']}/{v['termines']})")
+    return lines
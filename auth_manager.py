@@ -1,12 +1,22 @@
 import json
 import os
-from telethon import TelegramClient
-from config import API_ID, API_HASH, SESSION_PATH, AUTH_STATE_FILE, USER_PHONE
+from config import SESSION_PATH, AUTH_STATE_FILE, USER_PHONE
+import telegram_client
 
 class AuthManager:
     def __init__(self):
-        self.client = None
-        self._load_state()
+        # État lu au premier usage (/connect, /code), pas à l'import
+        self._state = None
+    
+    @property
+    def state(self):
+        if self._state is None:
+            self._load_state()
+        return self._state
+    
+    @state.setter
+    def state(self, value):
+        self._state = value
     
     def _load_state(self):
         if os.path.exists(AUTH_STATE_FILE):
@@ -24,11 +34,10 @@ class AuthManager:
     
     async def send_code(self):
         """Envoie le code à votre numéro pré-configuré"""
-        self.client = TelegramClient(SESSION_PATH, API_ID, API_HASH)
-        await self.client.connect()
+        client = await telegram_client.ensure_connected()
         
         try:
-            result = await self.client.send_code_request(USER_PHONE)
+            result = await client.send_code_request(USER_PHONE)
             
             self.state = {
                 'step': 'waiting_code',
@@ -50,7 +59,8 @@ class AuthManager:
         real_code = code[2:] if code.startswith('aa') else code
         
         try:
-            await self.client.sign_in(
+            client = await telegram_client.ensure_connected()
+            await client.sign_in(
                 phone=USER_PHONE,
                 code=real_code,
                 phone_code_hash=self.state['phone_code_hash']
@@ -59,7 +69,7 @@ class AuthManager:
             self.state = {'step': 'connected'}
             self._save_state()
             
-            await self.client.disconnect()
+            # Le client reste connecté : /sync et l'écoute le réutilisent
             return True, "✅ Connecté ! Utilisez /sync ou /fullsync"
             
         except Exception as e:
@@ -67,8 +77,7 @@ class AuthManager:
     
     async def reset(self):
         """Déconnexion complète"""
-        if self.client:
-            await self.client.disconnect()
+        await telegram_client.reset()
         self.state = {'step': 'idle'}
         self._save_state()
         if os.path.exists(SESSION_PATH + ".session"):
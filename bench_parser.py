@@ -0,0 +1,59 @@
+"""Micro-benchmark du parseur de messages.
+
+    python bench_parser.py [nombre_de_messages]
+
+Compare l'ancienne regex (.*? + DOTALL sur tout le texte) au parseur
+ligne par ligne de message_parser, sur un corpus d'exemples du canal.
+"""
+import re
+import sys
+import time
+from message_parser import parse_text
+
+# Ancienne regex de scraper.py, gardée comme référence
+LEGACY_PATTERN = re.compile(
+    r'PRÉDICTION\s*#(\d+).*?'
+    r'Couleur:\s*([^\n]+).*?'
+    r'Statut:\s*([^\n]+)',
+    re.IGNORECASE | re.DOTALL
+)
+
+SAMPLES = [
+    "🎯 PRÉDICTION #1234\n🎨 Couleur: ♥️ Cœur\n📊 Statut: ⏳ En attente",
+    "🎯 PRÉDICTION #87\nCouleur: ♠️ Pique\nMise: 2%\nStatut: ✅ GAGNÉ",
+    "prédiction #455\nCouleur: ♦️ Carreau\nStatut: ❌ PERDU",
+    "🔥 Bonjour à tous ! Les prédictions reprennent à 14h. Restez connectés 🔥",
+    "📢 Rappel : rejoignez le VIP pour plus de signaux.\n" * 12,
+    "Résultats de la journée :\n" + "Jeu terminé, bonne soirée à tous.\n" * 30,
+    "✅✅✅ Encore un gain ! Merci à tous ✅✅✅",
+    "🎯 PRÉDICTION #999\n" + "Analyse détaillée du tableau précédent.\n" * 20
+    + "Couleur: ♣️ Trèfle\nStatut: ✅ GAGNÉ",
+]
+
+def legacy_parse(text):
+    match = LEGACY_PATTERN.search(text)
+    if not match:
+        return None
+    return match.group(1), match.group(2).strip(), match.group(3).strip()
+
+def bench(name, parse, corpus):
+    start = time.perf_counter()
+    hits = sum(1 for text in corpus if parse(text))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {len(corpus) / elapsed:>12,.0f} msg/s  {hits} prédictions  {elapsed * 1000:.1f} ms")
+    return elapsed
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    corpus = [SAMPLES[i % len(SAMPLES)] for i in range(n)]
+
+    for text in SAMPLES:
+        if legacy_parse(text) != parse_text(text):
+            print(f"⚠️ Résultat différent pour : {text[:40]!r}")
+
+    legacy = bench('regex', legacy_parse, corpus)
+    fast = bench('parseur', parse_text, corpus)
+    print(f"Gain: x{legacy / fast:.1f}")
+
+if __name__ == '__main__':
+    main()
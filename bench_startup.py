@@ -0,0 +1,69 @@
+"""Benchmark du démarrage à froid.
+
+    python bench_startup.py [répétitions]
+
+Mesure dans des process neufs le temps de `import main`, celui des modules
+lourds chargés plus tard (Telethon, numpy, ReportLab), et le délai avant
+que /health réponde en lançant main.py sur un port libre avec un DATA_DIR
+temporaire (le process est arrêté dès la première réponse).
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+IMPORTS = {
+    'import main': 'import main',
+    'modules différés': 'import telethon, analytics, pdf_generator',
+}
+
+def import_time(code):
+    """Durée de l'import mesurée dans le sous-process (hors démarrage de l'interpréteur)"""
+    probe = f"import time; t = time.perf_counter(); {code}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def time_to_healthy(timeout=30):
+    """Secondes entre le lancement de main.py et la première réponse 200 de /health"""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, PORT=str(port), DATA_DIR=data_dir)
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, 'main.py'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while time.perf_counter() - start < timeout:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as r:
+                        if r.status == 200:
+                            return time.perf_counter() - start
+                except OSError:
+                    time.sleep(0.01)
+            raise TimeoutError(f"/health muet après {timeout}s")
+        finally:
+            process.terminate()
+            process.wait()
+
+def report(name, samples):
+    print(f"{name:<20} médiane {statistics.median(samples) * 1000:>8.1f} ms  min {min(samples) * 1000:>8.1f} ms")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    for name, code in IMPORTS.items():
+        report(name, [import_time(code) for _ in range(n)])
+    report('/health prêt', [time_to_healthy() for _ in range(n)])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""Benchmarks des chemins critiques : ingestion, sync, requêtes, stats, rapport.
+
+    python benchmark.py [--scale 10000] [--backends json,sqlite] [--repeat 3]
+
+Aucun accès réseau : les messages viennent de synthetic.py (canal factice
+à la place de Telethon). Chaque backend tourne dans deux sous-process avec
+leur propre DATA_DIR temporaire : un pour les temps, un sous tracemalloc
+pour le pic mémoire de chaque chemin (le traçage fausserait les temps).
+
+Les latences sont mesurées par élément (message, lot, requête) ; les chemins
+de bout en bout (sync, réconciliation, instantané, analyse, rapport) sont
+rejoués --repeat fois, la colonne « n » donne le nombre d'échantillons.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+QUERIES = {
+    'sans filtre': None,
+    'couleur': {'couleur': 'coeur'},
+    'couleur+statut': {'couleur': 'coeur', 'statut': 'gagné'},
+    'numero': {'numero': '700'},
+    'dates': {'date_from': '2025-01-10', 'date_to': '2025-01-20'},
+}
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+@contextmanager
+def peak_memory(out):
+    """Pic des allocations Python du bloc au-dessus de son point de départ (Mo), sous tracemalloc"""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    yield
+    out.append((tracemalloc.get_traced_memory()[1] - base) / 1024 / 1024)
+
+def result(name, items, elapsed, latencies, peaks):
+    return {
+        'name': name,
+        'items': items,
+        'samples': len(latencies),
+        'throughput': items / elapsed if elapsed else 0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_mb': max(peaks) if peaks else None,
+    }
+
+def disk_mb(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    ) / 1024 / 1024
+
+def timed(func, repeat, peaks):
+    latencies = []
+    for _ in range(repeat):
+        with peak_memory(peaks):
+            start = time.perf_counter()
+            func()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+def run_backend(scale, repeat, trace=False):
+    """Exécuté dans le sous-process : STORAGE_BACKEND et DATA_DIR déjà fixés"""
+    if trace:
+        tracemalloc.start()
+    import multiprocessing
+    from telethon.tl.types import InputPeerChannel
+    from config import SYNC_BATCH_SIZE, DEFAULT_CHANNEL
+    import storage
+    import scraper as scraper_module
+    import telegram_client
+    import report_runner
+    from message_parser import parse_message
+    from synthetic import generate_messages, FakeChannel
+
+    results = []
+    messages = generate_messages(scale)
+
+    # Parsing seul, message par message
+    predictions, latencies, peaks = [], [], []
+    with peak_memory(peaks):
+        for m in messages:
+            t = time.perf_counter()
+            p = parse_message(m)
+            latencies.append(time.perf_counter() - t)
+            if p:
+                predictions.append(p)
+    results.append(result('parse', len(messages), sum(latencies), latencies, peaks))
+
+    # Ingestion par lots
+    storage.clear_all()
+    latencies, peaks = [], []
+    start = time.perf_counter()
+    with peak_memory(peaks):
+        for i in range(0, len(predictions), SYNC_BATCH_SIZE):
+            t = time.perf_counter()
+            storage.add_predictions(predictions[i:i + SYNC_BATCH_SIZE])
+            latencies.append(time.perf_counter() - t)
+    results.append(result('ingest (lot)', len(predictions), time.perf_counter() - start, latencies, peaks))
+
+    # Ingestion message par message (écoute en direct)
+    storage.clear_all()
+    sample = predictions[:1000]
+    latencies, peaks = [], []
+    start = time.perf_counter()
+    with peak_memory(peaks):
+        for p in sample:
+            t = time.perf_counter()
+            storage.add_prediction(
+                p['message_id'], p['numero'], p['couleur'], p['statut'], p['raw_text'], p['date']
+            )
+            latencies.append(time.perf_counter() - t)
+    results.append(result('ingest (unitaire)', len(sample), time.perf_counter() - start, latencies, peaks))
+
+    # Sync complète de bout en bout sur le canal factice, base vidée à chaque passe
+    telegram_client._client = FakeChannel(messages)
+    telegram_client._channels[DEFAULT_CHANNEL] = InputPeerChannel(0, 0)
+    # Pas de serveur à ménager : aucun espacement entre pages
+    telegram_client.history_limiter.interval = 0
+    scraper_module.SYNC_LIMIT = scale + 1
+
+    def full_sync():
+        storage.clear_all()
+        asyncio.run(scraper_module.scraper.sync(full=True))
+
+    peaks = []
+    latencies = timed(full_sync, repeat, peaks)
+    results.append(result('sync complète', len(messages) * repeat, sum(latencies), latencies, peaks))
+
+    # Réconciliation : les prédictions en attente reçoivent leur statut final.
+    # Entre deux passes, elles sont remises en attente (hors mesure).
+    pending = [m for m in messages if 'En attente' in m.text]
+    latencies, peaks, checked = [], [], 0
+    for i in range(repeat):
+        if i:
+            for m in pending:
+                m.text = m.text.replace('✅ GAGNÉ', '⏳ En attente')
+            storage.upsert_predictions([parse_message(m) for m in pending])
+        for m in pending:
+            m.text = m.text.replace('⏳ En attente', '✅ GAGNÉ')
+        with peak_memory(peaks):
+            start = time.perf_counter()
+            checked += asyncio.run(scraper_module.scraper.reconcile())['checked']
+            latencies.append(time.perf_counter() - start)
+    results.append(result('réconciliation', checked, sum(latencies), latencies, peaks))
+
+    # Place sur le disque une fois le journal compacté (instantané compris)
+    storage.compact()
+    disk = disk_mb(os.environ['DATA_DIR'])
+
+    # Requêtes /filter
+    for name, filters in QUERIES.items():
+        peaks = []
+        latencies = timed(lambda: storage.get_predictions(filters), 20, peaks)
+        results.append(result(f"requête {name}", 20, sum(latencies), latencies, peaks))
+
+    # /stats et /health
+    peaks = []
+    latencies = timed(storage.get_stats, 200, peaks)
+    results.append(result('get_stats', 200, sum(latencies), latencies, peaks))
+
+    # Instantané en colonnes (écrit après une sync qui a ajouté des lignes)
+    from snapshot import write_snapshot, open_snapshot
+    peaks = []
+    latencies = timed(write_snapshot, repeat, peaks)
+    results.append(result('write_snapshot', len(predictions) * repeat, sum(latencies), latencies, peaks))
+    snap = open_snapshot()
+    peaks = []
+    latencies = timed(lambda: snap.stats({'couleur': 'coeur'}), 20, peaks)
+    results.append(result('instantané stats', 20, sum(latencies), latencies, peaks))
+
+    # /analyse
+    from analytics import analyse
+    peaks = []
+    latencies = timed(analyse, repeat, peaks)
+    results.append(result('analyse', len(predictions) * repeat, sum(latencies), latencies, peaks))
+
+    # /report : le chemin du worker (iter_predictions paginé + analyse + PDF), sans le cache
+    report_runner._init_worker(multiprocessing.Value('i', 0), multiprocessing.Value('b', 0))
+    rows, peaks = [], []
+
+    def report():
+        path, total = report_runner._build(None)
+        os.remove(path)
+        rows.append(total)
+
+    latencies = timed(report, repeat, peaks)
+    results.append(result('rapport', sum(rows), sum(latencies), latencies, peaks))
+
+    return {'results': results, 'disk_mb': disk}
+
+def run_subprocess(backend, args, trace):
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, STORAGE_BACKEND=backend, DATA_DIR=data_dir)
+        command = [sys.executable, __file__, '--run', backend,
+                   '--scale', str(args.scale), '--repeat', str(args.repeat)]
+        output = subprocess.run(command + (['--trace'] if trace else []), env=env, capture_output=True, text=True)
+    if output.returncode:
+        sys.exit(f"❌ {backend}:\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=10000, help="messages synthétiques (1k à 500k)")
+    parser.add_argument('--backends', default='json,sqlite')
+    parser.add_argument('--repeat', type=int, default=3, help="passes des chemins de bout en bout")
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--trace', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_backend(args.scale, args.repeat, args.trace)))
+        return
+
+    for backend in args.backends.split(','):
+        run = run_subprocess(backend, args, trace=False)
+        # Seconde passe sous tracemalloc : pic mémoire propre à chaque chemin
+        peaks = {r['name']: r['peak_mb'] for r in run_subprocess(backend, args, trace=True)['results']}
+
+        print(f"\n== {backend} ({args.scale} messages) ==")
+        print(f"{'chemin':<24}{'éléments':>10}{'n':>6}{'débit/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'pic Mo':>10}")
+        for r in run['results']:
+            print(
+                f"{r['name']:<24}{r['items']:>10}{r['samples']:>6}{r['throughput']:>12,.0f}"
+                f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{peaks[r['name']]:>10.1f}"
+            )
+        print(f"disque après sync : {run['disk_mb']:.2f} Mo")
+
+if __name__ == '__main__':
+    main()
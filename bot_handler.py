@@ -1,19 +1,135 @@
 import os
+import asyncio
 from datetime import datetime
 from telegram import Update
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, ContextTypes
-from config import BOT_TOKEN, ADMIN_ID, CHANNEL_USERNAME, USER_PHONE
-from storage import get_predictions, get_stats, clear_all
+from config import (BOT_TOKEN, ADMIN_ID, CHANNEL_USERNAME, USER_PHONE, CHANNELS, DEFAULT_CHANNEL,
+                    SYNC_INTERVAL_MINUTES, DAILY_REPORT_TIME)
+from storage import get_stats, get_last_sync, clear_all, count_predictions
 from scraper import scraper
 from auth_manager import auth_manager
-from pdf_generator import generate_pdf
+from report_runner import report_runner, ReportCancelled
+import report_cache
+from jobs import coordinator
+from normalize import normalize_filters
+from progress import ProgressReporter
+from health import request_refresh
+from metrics import timed, COMMAND_SECONDS, COMMAND_ERRORS
 
 def is_admin(user_id: int) -> bool:
     return user_id == ADMIN_ID
 
+UNKNOWN_CHANNEL = f"❌ Canal inconnu. Canaux: {', '.join(CHANNELS)}"
+
+def parse_channels(args):
+    """Canaux visés : [canal] en premier argument, sinon tous. None si inconnu."""
+    if not args:
+        return list(CHANNELS)
+    key = args[0].lower()
+    return [key] if key in CHANNELS else None
+
+def parse_channel(args):
+    """Canal visé : premier argument, sinon le canal par défaut. None si inconnu."""
+    if not args:
+        return DEFAULT_CHANNEL
+    key = args[0].lower()
+    return key if key in CHANNELS else None
+
+def sync_summary(results, full):
+    """Message de fin de /sync ou /fullsync, une ligne par canal s'il y en a plusieurs"""
+    lines = []
+    for channel, r in results.items():
+        prefix = f"{channel}: " if len(results) > 1 else ""
+        if isinstance(r, BaseException):
+            lines.append(f"❌ {prefix}Erreur: {str(r)[:300]}")
+        elif not full:
+            lines.append(f"✅ {prefix}**{r['new']}** nouvelles prédictions !")
+        elif r['done']:
+            lines.append(f"✅ {prefix}**{r['new']}** prédictions récupérées !")
+        else:
+            lines.append(f"⏸️ {prefix}**{r['new']}** prédictions récupérées ({r['scanned']} messages).")
+    if full and any(not isinstance(r, BaseException) and not r['done'] for r in results.values()):
+        lines.append("Relancez /fullsync pour continuer.")
+    return '\n'.join(lines)
+
+def reconcile_summary(results):
+    """Message de fin de /reconcile, une ligne par canal s'il y en a plusieurs"""
+    lines = []
+    for channel, r in results.items():
+        prefix = f"{channel}: " if len(results) > 1 else ""
+        if isinstance(r, BaseException):
+            lines.append(f"❌ {prefix}Erreur: {str(r)[:300]}")
+        else:
+            lines.append(f"🔁 {prefix}**{r['updated']}** statuts mis à jour sur {r['checked']} en attente")
+    return '\n'.join(lines)
+
+def waiting_title(key, title):
+    """Premier texte du message d'une tâche : en cours (partagée), en file, ou son titre"""
+    if key is not None and coordinator.state(key):
+        return "⏳ Déjà en cours, résultat partagé à la fin..."
+    if coordinator.current:
+        return f"⏳ En file d'attente après /{coordinator.current[0]}..."
+    return title
+
+def report_caption(total, channel):
+    return f"✅ Rapport: {total} prédictions" + (f" ({CHANNELS[channel]['name']})" if len(CHANNELS) > 1 else "")
+
+async def send_report(bot, key, path, caption, file_id=None):
+    """Envoie un rapport à l'admin : par file_id si Telegram le connaît déjà, sinon par fichier"""
+    if file_id:
+        try:
+            await bot.send_document(chat_id=ADMIN_ID, document=file_id, caption=caption)
+            return
+        except BadRequest:
+            # file_id expiré ou invalide : on retéléverse le fichier
+            await asyncio.to_thread(report_cache.forget_file_id, key)
+    with open(path, 'rb') as f:
+        sent = await bot.send_document(chat_id=ADMIN_ID, document=f, caption=caption)
+    if key is not None and sent.document:
+        await asyncio.to_thread(report_cache.remember_file_id, key, sent.document.file_id)
+
+async def deliver_report(bot, filters, channel, progress_callback=None):
+    """Envoie à l'admin le rapport PDF des filtres (/report, rapport quotidien).
+
+    Mêmes filtres et données inchangées : le PDF déjà envoyé est renvoyé tel
+    quel. Sinon la génération passe par le coordinateur : une demande identique
+    la rejoint (un seul envoi), les autres attendent leur tour.
+    Retourne le nombre de prédictions, None si aucune donnée.
+    """
+    key = await asyncio.to_thread(report_cache.cache_key, filters, channel)
+    cached = await asyncio.to_thread(report_cache.lookup, key)
+    if cached is not None:
+        await send_report(bot, key, cached['path'], report_caption(cached['total'], channel), cached['file_id'])
+        return cached['total']
+    
+    async def generate():
+        # Resté en file derrière une synchronisation : les données ont pu changer
+        fresh = await asyncio.to_thread(report_cache.cache_key, filters, channel)
+        cached = await asyncio.to_thread(report_cache.lookup, fresh)
+        if cached is not None:
+            await send_report(bot, fresh, cached['path'], report_caption(cached['total'], channel), cached['file_id'])
+            return cached['total']
+        
+        result = await report_runner.run(filters, progress_callback, channel=channel)
+        if result is None:
+            return None
+        
+        pdf_path, total = result
+        cached_path = await asyncio.to_thread(report_cache.store, fresh, pdf_path, total, channel)
+        if cached_path is None:
+            # Trop gros pour le cache : envoyé puis supprimé comme avant
+            await send_report(bot, None, pdf_path, report_caption(total, channel))
+            os.remove(pdf_path)
+        else:
+            await send_report(bot, fresh, cached_path, report_caption(total, channel))
+        return total
+    
+    return await coordinator.run(('report', key), generate)
+
 class Handlers:
-    def __init__(self):
-        self.syncing = False
+    # /sync, /fullsync, /reconcile, /clear et /report passent par le coordinateur
+    # (jobs.py) : jamais deux à la fois sur le stockage, les doublons sont fusionnés
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not is_admin(update.effective_user.id):
@@ -28,10 +144,17 @@ class Handlers:
             f"Commandes:\n"
             f"/connect - Recevoir le code SMS\n"
             f"/code aaXXXXXX - Confirmer le code\n"
-            f"/sync - Synchroniser récent\n"
-            f"/fullsync - Tout l'historique\n"
-            f"/report - Générer PDF\n"
-            f"/stats - Statistiques",
+            f"/sync [canal] - Synchroniser récent\n"
+            f"/fullsync [canal] - Tout l'historique\n"
+            f"/reconcile [canal] - Statuts des prédictions en attente\n"
+            f"/filter - Filtrer (couleur statut numero=N du=AAAA-MM-JJ au=AAAA-MM-JJ)\n"
+            f"/report [canal] - Générer PDF\n"
+            f"/cancel - Annuler le rapport en cours\n"
+            f"/analyse [canal] - Analyse détaillée\n"
+            f"/stats [canal] - Statistiques\n\n"
+            f"Canaux: {', '.join(CHANNELS)}\n"
+            f"Sync auto: {f'toutes les {SYNC_INTERVAL_MINUTES} min' if SYNC_INTERVAL_MINUTES > 0 else 'désactivée'}\n"
+            f"Rapport quotidien: {f'{DAILY_REPORT_TIME} UTC' if DAILY_REPORT_TIME else 'désactivé'}",
             parse_mode='Markdown'
         )
     
@@ -50,6 +173,7 @@ class Handlers:
             success, result = await auth_manager.send_code()
             await msg.edit_text(result)
         except Exception as e:
+            COMMAND_ERRORS.inc(command='connect')
             await msg.edit_text(f"❌ Erreur: {str(e)}")
     
     async def code(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -67,7 +191,10 @@ class Handlers:
         try:
             success, result = await auth_manager.verify_code(code)
             await msg.edit_text(result)
+            if success:
+                await scraper.listen()
         except Exception as e:
+            COMMAND_ERRORS.inc(command='code')
             await msg.edit_text(f"❌ Erreur: {str(e)}")
     
     async def sync(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -78,24 +205,59 @@ class Handlers:
             await update.message.reply_text("❌ Tapez /connect puis /code d'abord")
             return
         
-        if self.syncing:
-            await update.message.reply_text("⏳ Déjà en cours...")
+        channels = parse_channels(context.args)
+        if channels is None:
+            await update.message.reply_text(UNKNOWN_CHANNEL)
             return
         
-        self.syncing = True
-        msg = await update.message.reply_text("🔄 Synchronisation...")
+        # Même clé que la synchronisation planifiée : /sync pendant celle-ci la rejoint
+        key = ('sync', tuple(channels))
+        msg = await update.message.reply_text(waiting_title(key, "🔄 Synchronisation..."))
+        
+        async def job():
+            reporter = ProgressReporter(msg, "🔄 Synchronisation...").start()
+            try:
+                # Tous les canaux en parallèle sur la même connexion
+                return await scraper.sync_recent(channels, reporter.update)
+            finally:
+                await reporter.stop()
         
         try:
-            async def progress(n):
-                if n % 500 == 0:
-                    await msg.edit_text(f"📥 {n} messages...")
-            
-            result = await scraper.sync(full=False, progress_callback=progress)
-            await msg.edit_text(f"✅ **{result['new']}** nouvelles prédictions !")
+            results, reconciled = await coordinator.run(key, job)
+            if any(isinstance(r, BaseException) for r in (*results.values(), *reconciled.values())):
+                COMMAND_ERRORS.inc(command='sync')
+            summary = sync_summary(results, full=False)
+            if reconciled:
+                summary += '\n' + reconcile_summary(reconciled)
+            await msg.edit_text(summary)
         except Exception as e:
+            COMMAND_ERRORS.inc(command='sync')
+            await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
+    
+    async def reconcile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/reconcile [canal] - Relit les prédictions en attente pour leur statut final"""
+        if not is_admin(update.effective_user.id):
+            return
+        
+        if not auth_manager.is_connected():
+            await update.message.reply_text("❌ Tapez /connect puis /code d'abord")
+            return
+        
+        channels = parse_channels(context.args)
+        if channels is None:
+            await update.message.reply_text(UNKNOWN_CHANNEL)
+            return
+        
+        key = ('reconcile', tuple(channels))
+        msg = await update.message.reply_text(waiting_title(key, "🔁 Réconciliation des prédictions en attente..."))
+        try:
+            results = await coordinator.run(key, lambda: scraper.reconcile_all(channels))
+            if any(isinstance(r, BaseException) for r in results.values()):
+                COMMAND_ERRORS.inc(command='reconcile')
+            await msg.edit_text(reconcile_summary(results))
+        except Exception as e:
+            COMMAND_ERRORS.inc(command='reconcile')
             await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
-        finally:
-            self.syncing = False
     
     async def fullsync(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not is_admin(update.effective_user.id):
@@ -105,40 +267,104 @@ class Handlers:
             await update.message.reply_text("❌ Non connecté")
             return
         
-        msg = await update.message.reply_text("🔄 Synchronisation complète...")
+        channels = parse_channels(context.args)
+        if channels is None:
+            await update.message.reply_text(UNKNOWN_CHANNEL)
+            return
+        
+        resume = []
+        for channel in channels:
+            state = await asyncio.to_thread(get_last_sync, channel)
+            if state.get('oldest_message_id') and not state.get('backfill_done'):
+                prefix = f"{channel} " if len(channels) > 1 else ""
+                resume.append(f"{prefix}#{state['oldest_message_id']}")
+        if resume:
+            title = f"🔄 Reprise de la synchronisation complète sous {', '.join(resume)}..."
+        else:
+            title = "🔄 Synchronisation complète..."
+        key = ('fullsync', tuple(channels))
+        msg = await update.message.reply_text(waiting_title(key, title))
+        
+        async def job():
+            reporter = ProgressReporter(msg, title).start()
+            try:
+                return await scraper.sync_all(full=True, progress_callback=reporter.update, channels=channels)
+            finally:
+                await reporter.stop()
         
         try:
-            result = await scraper.sync(full=True)
-            await msg.edit_text(f"✅ **{result['new']}** prédictions récupérées !")
+            results = await coordinator.run(key, job)
+            if any(isinstance(r, BaseException) for r in results.values()):
+                COMMAND_ERRORS.inc(command='fullsync')
+            await msg.edit_text(sync_summary(results, full=True))
         except Exception as e:
+            COMMAND_ERRORS.inc(command='fullsync')
             await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
     
     async def report(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not is_admin(update.effective_user.id):
             return
         
-        predictions = get_predictions(context.user_data.get('filters'))
-        if not predictions:
-            await update.message.reply_text("❌ Aucune donnée. Faites /fullsync d'abord")
+        channel = parse_channel(context.args)
+        if channel is None:
+            await update.message.reply_text(UNKNOWN_CHANNEL)
             return
         
-        msg = await update.message.reply_text("📄 Génération PDF...")
+        # Clé du rapport inconnue avant la lecture du cache : seule la file est signalée
+        msg = await update.message.reply_text(waiting_title(None, "📄 Génération PDF..."))
         
         try:
-            pdf_path = generate_pdf(predictions, context.user_data.get('filters'))
-            
-            with open(pdf_path, 'rb') as f:
-                await context.bot.send_document(
-                    chat_id=ADMIN_ID,
-                    document=f,
-                    caption=f"✅ Rapport: {len(predictions)} prédictions"
-                )
+            async def progress(rows):
+                try:
+                    await msg.edit_text(f"📄 Génération PDF... {rows} lignes")
+                except Exception:
+                    pass
             
-            os.remove(pdf_path)
+            total = await deliver_report(context.bot, context.user_data.get('filters'), channel, progress)
+            if total is None:
+                await msg.edit_text("❌ Aucune donnée. Faites /fullsync d'abord")
+                return
             await msg.delete()
+        except ReportCancelled:
+            await msg.edit_text("🛑 Rapport annulé")
         except Exception as e:
+            COMMAND_ERRORS.inc(command='report')
             await msg.edit_text(f"❌ Erreur: {str(e)}")
     
+    async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/cancel - Annule le rapport en cours"""
+        if not is_admin(update.effective_user.id):
+            return
+        
+        if report_runner.cancel():
+            await update.message.reply_text("🛑 Annulation demandée...")
+        else:
+            await update.message.reply_text("Aucun rapport en cours")
+    
+    async def analyse(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/analyse - Taux par couleur, numéro, heure, séries et taux glissants"""
+        if not is_admin(update.effective_user.id):
+            return
+        
+        channel = parse_channel(context.args)
+        if channel is None:
+            await update.message.reply_text(UNKNOWN_CHANNEL)
+            return
+        
+        msg = await update.message.reply_text("🔎 Analyse...")
+        try:
+            # numpy n'est chargé qu'ici (ou par le préchauffage après le démarrage)
+            from analytics import analyse, format_analysis
+            result = await asyncio.to_thread(analyse, context.user_data.get('filters'), None, channel)
+            if not result['total']:
+                await msg.edit_text("❌ Aucune donnée. Faites /fullsync d'abord")
+                return
+            text = '\n'.join(["📈 Analyse"] + format_analysis(result))
+            await msg.edit_text(text[:4000])
+        except Exception as e:
+            COMMAND_ERRORS.inc(command='analyse')
+            await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
+    
     async def filter_cmd(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not is_admin(update.effective_user.id):
             return
@@ -148,9 +374,28 @@ class Handlers:
             await update.message.reply_text("✅ Filtres réinitialisés")
             return
         
-        filters = {'couleur': context.args[0]}
-        if len(context.args) > 1:
-            filters['statut'] = ' '.join(context.args[1:])
+        # /filter coeur gagné  ou  /filter couleur=coeur numero=12 du=2026-01-01 au=2026-01-31
+        keys = {'couleur': 'couleur', 'statut': 'statut', 'numero': 'numero',
+                'du': 'date_from', 'au': 'date_to'}
+        filters = {}
+        positional = []
+        for arg in context.args:
+            key, sep, value = arg.partition('=')
+            if sep and key.lower() in keys:
+                filters[keys[key.lower()]] = value
+            else:
+                positional.append(arg)
+        
+        if positional:
+            filters.setdefault('couleur', positional[0])
+        if len(positional) > 1:
+            filters.setdefault('statut', ' '.join(positional[1:]))
+        
+        try:
+            normalize_filters(filters)
+        except ValueError:
+            await update.message.reply_text("❌ Dates au format AAAA-MM-JJ")
+            return
         
         context.user_data['filters'] = filters
         await update.message.reply_text(f"✅ Filtre: {filters}")
@@ -159,36 +404,85 @@ class Handlers:
         if not is_admin(update.effective_user.id):
             return
         
-        s = get_stats()
-        preds = get_predictions()
-        gagnes = sum(1 for p in preds if 'gagn' in p['statut'].lower())
+        channels = parse_channels(context.args)
+        if channels is None:
+            await update.message.reply_text(UNKNOWN_CHANNEL)
+            return
         
-        await update.message.reply_text(
-            f"📊 Stats\n"
-            f"• Total: {s['total']}\n"
-            f"• Gagnés: {gagnes}\n"
-            f"• Taux: {round(gagnes/s['total']*100,1)}%" if s['total'] else "N/A"
-        )
+        filters = context.user_data.get('filters')
+        lines = []
+        for channel in channels:
+            # Hors de la boucle : le verrou du stockage peut être tenu par une sync
+            s = await asyncio.to_thread(get_stats, channel)
+            lines.append("📊 Stats" if len(CHANNELS) == 1 else f"📊 Stats — {CHANNELS[channel]['name']}")
+            if not s['total']:
+                lines.append("N/A")
+                continue
+            
+            lines += [
+                f"• Total: {s['total']}",
+                f"• Gagnés: {s['gagnes']}",
+                f"• Perdus: {s['perdus']}",
+                f"• En attente: {s['en_attente']}",
+                f"• Taux: {s['taux']}%" if s['taux'] is not None else "• Taux: N/A",
+            ]
+            for couleur, c in s['couleurs'].items():
+                taux = f"{c['taux']}%" if c['taux'] is not None else "N/A"
+                lines.append(f"  {couleur}: {c['gagnes']}/{c['gagnes'] + c['perdus']} ({taux})")
+            
+            if filters:
+                # Comptage seul, sans charger les lignes
+                count = await asyncio.to_thread(count_predictions, filters, channel)
+                lines.append(f"• Filtre {filters}: {count} prédictions")
+        
+        await update.message.reply_text('\n'.join(lines))
     
     async def clear(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not is_admin(update.effective_user.id):
             return
-        clear_all()
-        await update.message.reply_text("🗑️ Effacé !")
+        channels = parse_channels(context.args)
+        if channels is None:
+            await update.message.reply_text(UNKNOWN_CHANNEL)
+            return
+        
+        # En file derrière une synchronisation en cours, jamais en même temps
+        key = ('clear', tuple(channels))
+        msg = await update.message.reply_text(waiting_title(key, "🗑️ Effacement..."))
+        
+        async def job():
+            for channel in channels:
+                await asyncio.to_thread(clear_all, channel)
+        
+        try:
+            await coordinator.run(key, job)
+            request_refresh()
+            await msg.edit_text("🗑️ Effacé !")
+        except Exception as e:
+            COMMAND_ERRORS.inc(command='clear')
+            await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
 
 handlers = Handlers()
 
 def setup_bot():
     app = Application.builder().token(BOT_TOKEN).build()
     
-    app.add_handler(CommandHandler("start", handlers.start))
-    app.add_handler(CommandHandler("connect", handlers.connect))
-    app.add_handler(CommandHandler("code", handlers.code))
-    app.add_handler(CommandHandler("sync", handlers.sync))
-    app.add_handler(CommandHandler("fullsync", handlers.fullsync))
-    app.add_handler(CommandHandler("report", handlers.report))
-    app.add_handler(CommandHandler("filter", handlers.filter_cmd))
-    app.add_handler(CommandHandler("stats", handlers.stats))
-    app.add_handler(CommandHandler("clear", handlers.clear))
+    commands = {
+        "start": handlers.start,
+        "connect": handlers.connect,
+        "code": handlers.code,
+        "sync": handlers.sync,
+        "fullsync": handlers.fullsync,
+        "reconcile": handlers.reconcile,
+        "report": handlers.report,
+        "cancel": handlers.cancel,
+        "analyse": handlers.analyse,
+        "filter": handlers.filter_cmd,
+        "stats": handlers.stats,
+        "clear": handlers.clear,
+    }
+    for name, callback in commands.items():
+        # Latence et erreurs par commande, exposées sur /metrics
+        callback = timed(COMMAND_SECONDS, COMMAND_ERRORS, command=name)(callback)
+        app.add_handler(CommandHandler(name, callback))
     
     return app
@@ -0,0 +1,53 @@
+import json
+import zlib
+from collections import Counter
+
+# Texte brut des messages, compressé ligne à ligne (SQLite). Un texte de quelques
+# centaines d'octets ne se compresse pas seul : il faut un dictionnaire, appris sur
+# les textes déjà stockés du canal (voir database._train_dictionary).
+# Le premier octet donne la version :
+# - 0 : texte UTF-8 en clair, tant qu'aucun dictionnaire n'est appris
+# - 1 : ancien dictionnaire écrit à la main, gardé pour relire les lignes existantes
+# - 2 et plus : dictionnaires appris, stockés dans la base du canal
+PLAIN = 0
+ZDICT_V1 = (
+    "Résultats de la journée :\nJeu terminé, bonne soirée à tous.\n"
+    "📢 Rappel : rejoignez le VIP pour plus de signaux.\n"
+    "🔥 Bonjour à tous ! Les prédictions reprennent à 14h. Restez connectés 🔥"
+    "✅✅✅ Encore un gain ! Merci à tous ✅✅✅"
+    "Mise: 2%\n♣️ Trèfle♦️ Carreau♠️ Pique♥️ Cœur"
+    "📊 Statut: ⏳ En attente📊 Statut: ❌ PERDU📊 Statut: ✅ GAGNÉ"
+    "🎯 PRÉDICTION #\n🎨 Couleur: "
+).encode('utf-8')
+DICTIONARIES = {1: ZDICT_V1}
+ZDICT_SIZE = 32 * 1024  # fenêtre deflate : au-delà, le début du dictionnaire est ignoré
+_WBITS = -15  # deflate brut : ni en-tête ni somme de contrôle zlib
+
+def build_dictionary(texts, size=ZDICT_SIZE):
+    """Dictionnaire deflate tiré de textes réels, les plus fréquents à la fin (plus proches)"""
+    ordered = [text for text, _ in sorted(Counter(texts).items(), key=lambda item: item[1])]
+    return '\n'.join(ordered).encode('utf-8')[-size:]
+
+def compress_text(text, version=PLAIN, zdict=None):
+    if text is None:
+        return None
+    data = text.encode('utf-8')
+    if zdict is None:
+        return bytes([PLAIN]) + data
+    c = zlib.compressobj(9, zlib.DEFLATED, _WBITS, zdict=zdict)
+    return bytes([version]) + c.compress(data) + c.flush()
+
+def decompress_text(data, dictionaries=DICTIONARIES):
+    if data is None:
+        return None
+    if data[0] == PLAIN:
+        return data[1:].decode('utf-8')
+    d = zlib.decompressobj(_WBITS, zdict=dictionaries[data[0]])
+    return (d.decompress(data[1:]) + d.flush()).decode('utf-8')
+
+def pack_json(data):
+    """JSON compact compressé (partitions mensuelles archivées)"""
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'), 9)
+
+def unpack_json(data):
+    return json.loads(zlib.decompress(data))
@@ -13,6 +13,14 @@ API_HASH = "a8639172fa8d35dbfd8ea46286d349ab"
 CHANNEL_ID = -1003329818758
 CHANNEL_USERNAME = "VIP DE KOUAMÉ & JOKER"
 
+# Canaux suivis : clé courte -> id et nom. Le canal par défaut garde les fichiers
+# d'origine ; les autres s'ajoutent par CHANNELS="cle:-100123,autre:-100456"
+DEFAULT_CHANNEL = 'kouame'
+CHANNELS = {DEFAULT_CHANNEL: {'id': CHANNEL_ID, 'name': CHANNEL_USERNAME}}
+for _item in filter(None, os.getenv('CHANNELS', '').split(',')):
+    _key, _, _peer = _item.strip().partition(':')
+    CHANNELS.setdefault(_key.lower(), {'id': int(_peer), 'name': _key})
+
 # VOTRE NUMÉRO PRÉ-CONFIGURÉ
 USER_PHONE = "+22995501564"
 
@@ -20,11 +28,75 @@ USER_PHONE = "+22995501564"
 PORT = int(os.getenv('PORT', 10000))
 
 # Chemins
-DATA_DIR = '/data' if os.path.exists('/data') else '/tmp'
+DATA_DIR = os.getenv('DATA_DIR') or ('/data' if os.path.exists('/data') else '/tmp')
 PREDICTIONS_FILE = f"{DATA_DIR}/predictions.json"
+PREDICTIONS_LOG_FILE = f"{DATA_DIR}/predictions.log.jsonl"
 LAST_SYNC_FILE = f"{DATA_DIR}/last_sync.json"
+STATS_FILE = f"{DATA_DIR}/stats.json"
 SESSION_PATH = f"{DATA_DIR}/telethon_session"
 AUTH_STATE_FILE = f"{DATA_DIR}/auth_state.json"
+CHANNEL_CACHE_FILE = f"{DATA_DIR}/channel_entity.json"
+SNAPSHOT_FILE = f"{DATA_DIR}/predictions.snap"
+ARCHIVE_DIR = f"{DATA_DIR}/archive"
+
+# Stockage : 'sqlite' (défaut) ou 'json'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+DATABASE_PATH = os.getenv('DATABASE_PATH', f"{DATA_DIR}/predictions.db")
+
+# Ingestion : une écriture disque par lot, compaction du journal de temps en temps
+SYNC_BATCH_SIZE = 200
+COMPACT_THRESHOLD = 5000
+# Backend JSON : mois gardés ouverts (mois courant compris), les autres sont archivés compressés
+HOT_MONTHS = 2
+# Backend SQLite : textes stockés avant d'apprendre le dictionnaire de compression du canal
+ZDICT_MIN_TEXTS = 1000
+
+# Synchronisation : messages max par passe, point de contrôle, FloodWait toléré
+SYNC_LIMIT = 50000
+CHECKPOINT_EVERY = 500
+FLOOD_WAIT_MAX = 3600
+RECONNECT_RETRIES = 3
+
+# Pipeline de synchronisation : lecture -> analyse -> écriture
+SYNC_WAIT_TIME = 1  # secondes entre deux requêtes d'historique, tous canaux confondus (évite FloodWait)
+FETCH_CHUNK_SIZE = 100  # messages par paquet transmis à l'analyse
+PIPELINE_QUEUE_SIZE = 10  # paquets en attente max par file
+
+# Réconciliation : prédictions en attente relues par id (get_messages, 100 ids max
+# par requête), les plus récentes d'abord
+RECONCILE_BATCH_SIZE = 100
+RECONCILE_LIMIT = 2000
+
+# Progression /sync et /fullsync : une édition de message max toutes les N secondes
+PROGRESS_INTERVAL = 3
+
+# Rapports PDF : générés hors de la boucle asyncio
+# Process séparé avec SQLite seulement : le cache JSON d'un worker ne verrait pas les
+# écritures du bot (rapports périmés) et ses stats.json écraseraient celles du bot
+REPORT_USE_PROCESSES = os.getenv('REPORT_USE_PROCESSES', '1') == '1' and STORAGE_BACKEND == 'sqlite'
+REPORT_PROGRESS_INTERVAL = 3  # secondes entre deux mises à jour du message
+# Cache des rapports (mêmes filtres, mêmes données) : taille totale max, LRU au-delà
+REPORT_CACHE_DIR = f"{DATA_DIR}/reports"
+REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_MB', 200)) * 1024 * 1024
+
+# Planificateur : synchronisation incrémentale toutes les N minutes (0 : désactivée),
+# résumé et PDF de la veille envoyés à l'admin chaque jour à HH:MM UTC (vide : désactivé)
+SYNC_INTERVAL_MINUTES = int(os.getenv('SYNC_INTERVAL_MINUTES', 15))
+DAILY_REPORT_TIME = os.getenv('DAILY_REPORT_TIME', '08:00')
+
+# Lecture par pages (rapports) : lignes chargées à la fois
+ITER_PAGE_SIZE = 1000
+
+# Sonde /ready : instantané rafraîchi en arrière-plan (ou après une écriture)
+HEALTH_REFRESH_INTERVAL = 30
+
+def partition_path(path, channel=None):
+    """Fichier d'un canal : celui d'origine pour le canal par défaut, suffixé sinon"""
+    if not channel or channel == DEFAULT_CHANNEL:
+        return path
+    folder, name = os.path.split(path)
+    stem, dot, ext = name.partition('.')
+    return os.path.join(folder, f"{stem}_{channel}{dot}{ext}")
 
 def ensure_data_dir():
     import os
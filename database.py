@@ -1,90 +1,502 @@
 import sqlite3
-import json
+import threading
+import os
 from datetime import datetime
 from contextlib import contextmanager
-import os
+from normalize import (
+    normalize_couleur, normalize_statut, normalize_filters, make_prediction, COLUMNS, EN_ATTENTE
+)
+from aggregates import empty_aggregates, summarize
+from compression import compress_text, decompress_text, build_dictionary, DICTIONARIES, PLAIN
+from config import (
+    DATABASE_PATH, PREDICTIONS_FILE, PREDICTIONS_LOG_FILE, LAST_SYNC_FILE, ARCHIVE_DIR, ITER_PAGE_SIZE,
+    DEFAULT_CHANNEL, ZDICT_MIN_TEXTS, partition_path
+)
+
+DB_PATH = DATABASE_PATH
 
-DB_PATH = os.getenv('DATABASE_PATH', '/data/predictions.db')
+# Une base par canal (partition), une connexion partagée (WAL) et un verrou par base :
+# les canaux synchronisés en parallèle n'attendent pas les écritures des autres
+_conns = {}
+_locks = {}
+_connect_lock = threading.RLock()  # création des connexions (et migration initiale)
+_zdicts = {}  # canal -> version -> dictionnaire de compression de raw_text
+
+def _connect(channel=None):
+    channel = channel or DEFAULT_CHANNEL
+    if channel in _conns:
+        return _conns[channel]
+    with _connect_lock:
+        if channel in _conns:
+            return _conns[channel]
+        path = partition_path(DB_PATH, channel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        # Les triggers de stats doivent aussi voir les suppressions de REPLACE
+        conn.execute('PRAGMA recursive_triggers=ON')
+        if _create_tables(conn):
+            # Place libérée par le déplacement de raw_text rendue au disque
+            conn.execute('VACUUM')
+        _zdicts[channel] = {**DICTIONARIES, **dict(conn.execute('SELECT version, data FROM zdicts').fetchall())}
+        lock = _locks[channel] = threading.RLock()
+        # Verrou tenu pendant la migration : les autres threads attendent qu'elle finisse
+        with lock:
+            _conns[channel] = conn
+            if channel == DEFAULT_CHANNEL:
+                _migrate_json()
+        return conn
 
 @contextmanager
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    finally:
-        conn.close()
+def get_db(channel=None):
+    conn = _connect(channel)
+    with _locks[channel or DEFAULT_CHANNEL]:
+        try:
+            yield conn
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
 
-def init_db():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    with get_db() as conn:
+def _create_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id INTEGER UNIQUE,
+            numero TEXT,
+            couleur TEXT,
+            statut TEXT,
+            raw_text TEXT,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            couleur_norm TEXT,
+            outcome TEXT
+        )
+    ''')
+    _add_normalized_columns(conn)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pred_couleur ON predictions (couleur_norm, message_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pred_outcome ON predictions (outcome, message_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pred_numero ON predictions (numero, message_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pred_date ON predictions (date)')
+    # Texte brut à part, compressé : jamais lu par les stats, /analyse ni les rapports
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS raw_texts (
+            message_id INTEGER PRIMARY KEY,
+            data BLOB
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS zdicts (
+            version INTEGER PRIMARY KEY,
+            data BLOB
+        )
+    ''')
+    moved = _move_raw_text(conn)
+    _create_stats(conn)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS last_sync (
+            id INTEGER PRIMARY KEY,
+            last_message_id INTEGER DEFAULT 0,
+            sync_date TIMESTAMP
+        )
+    ''')
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(last_sync)')}
+    if 'oldest_message_id' not in columns:
+        conn.execute('ALTER TABLE last_sync ADD COLUMN oldest_message_id INTEGER DEFAULT 0')
+    if 'backfill_done' not in columns:
+        conn.execute('ALTER TABLE last_sync ADD COLUMN backfill_done INTEGER DEFAULT 0')
+    if 'data_version' not in columns:
+        conn.execute('ALTER TABLE last_sync ADD COLUMN data_version INTEGER DEFAULT 0')
+    conn.execute('''
+        INSERT OR IGNORE INTO last_sync (id, last_message_id, sync_date) 
+        VALUES (1, 0, NULL)
+    ''')
+    conn.commit()
+    return moved
+
+def _move_raw_text(conn):
+    """Bases existantes : raw_text sorti de predictions vers raw_texts (en clair jusqu'au dictionnaire)"""
+    rows = conn.execute('SELECT message_id, raw_text FROM predictions WHERE raw_text IS NOT NULL').fetchall()
+    if not rows:
+        return False
+    conn.executemany(
+        'INSERT OR IGNORE INTO raw_texts (message_id, data) VALUES (?, ?)',
+        [(r['message_id'], compress_text(r['raw_text'])) for r in rows]
+    )
+    conn.execute('UPDATE predictions SET raw_text = NULL WHERE raw_text IS NOT NULL')
+    return True
+
+def _add_normalized_columns(conn):
+    """Ajoute et remplit couleur_norm / outcome sur une base existante"""
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(predictions)')}
+    if 'couleur_norm' in columns and 'outcome' in columns:
+        return
+    if 'couleur_norm' not in columns:
+        conn.execute('ALTER TABLE predictions ADD COLUMN couleur_norm TEXT')
+    if 'outcome' not in columns:
+        conn.execute('ALTER TABLE predictions ADD COLUMN outcome TEXT')
+    rows = conn.execute('SELECT id, couleur, statut FROM predictions').fetchall()
+    conn.executemany(
+        'UPDATE predictions SET couleur_norm = ?, outcome = ? WHERE id = ?',
+        [(normalize_couleur(r['couleur']), normalize_statut(r['statut']), r['id']) for r in rows]
+    )
+
+def _stats_delta(row, delta):
+    """Corps de trigger : applique delta aux trois agrégats de la ligne"""
+    keys = (
+        "'total', ''",
+        f"'couleur', {row}.couleur_norm",
+        f"'jour', substr({row}.date, 1, 10)",
+    )
+    return ''.join(f"""
+        INSERT INTO stats (scope, key, outcome, n) VALUES ({key}, {row}.outcome, {delta})
+        ON CONFLICT (scope, key, outcome) DO UPDATE SET n = n + excluded.n;"""
+        for key in keys
+    )
+
+def _create_stats(conn):
+    """Agrégats (portée, clé, résultat) tenus à jour par triggers à l'ingestion"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats (
+            scope TEXT,
+            key TEXT,
+            outcome TEXT,
+            n INTEGER DEFAULT 0,
+            PRIMARY KEY (scope, key, outcome)
+        )
+    ''')
+    for event, body in (
+        ('INSERT', _stats_delta('NEW', 1)),
+        ('DELETE', _stats_delta('OLD', -1)),
+        ('UPDATE OF couleur_norm, outcome, date', _stats_delta('OLD', -1) + _stats_delta('NEW', 1)),
+    ):
+        name = 'stats_' + event.split()[0].lower()
+        conn.execute(f'CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON predictions BEGIN {body} END')
+    if not exists:
         conn.execute('''
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message_id INTEGER UNIQUE,
-                numero TEXT,
-                couleur TEXT,
-                statut TEXT,
-                raw_text TEXT,
-                date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            INSERT INTO stats (scope, key, outcome, n)
+            SELECT 'total', '', outcome, COUNT(*) FROM predictions GROUP BY outcome
+            UNION ALL
+            SELECT 'couleur', couleur_norm, outcome, COUNT(*) FROM predictions GROUP BY couleur_norm, outcome
+            UNION ALL
+            SELECT 'jour', substr(date, 1, 10), outcome, COUNT(*) FROM predictions GROUP BY substr(date, 1, 10), outcome
         ''')
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS last_sync (
-                id INTEGER PRIMARY KEY,
-                last_message_id INTEGER DEFAULT 0,
-                sync_date TIMESTAMP
+
+def init_db():
+    with get_db():
+        pass
+
+def _migrate_json():
+    """Import unique de predictions.json (+ journal) vers SQLite"""
+    if not (os.path.exists(PREDICTIONS_FILE) or os.path.exists(PREDICTIONS_LOG_FILE)):
+        return
+    
+    from storage import _select, _raw_texts, _partition, load_json
+    predictions = _select()
+    if predictions:
+        texts = _raw_texts(_partition(), predictions)
+        add_predictions([{**p, 'raw_text': texts[p['message_id']]} for p in predictions])
+    
+    last = load_json(LAST_SYNC_FILE, {})
+    if last.get('last_message_id'):
+        with get_db() as conn:
+            conn.execute(
+                'UPDATE last_sync SET last_message_id = ?, sync_date = ? WHERE id = 1',
+                (last['last_message_id'], last.get('sync_date'))
             )
-        ''')
-        conn.execute('''
-            INSERT OR IGNORE INTO last_sync (id, last_message_id, sync_date) 
-            VALUES (1, 0, NULL)
-        ''')
+    
+    # Renommer pour ne pas réimporter au prochain démarrage
+    for path in (PREDICTIONS_FILE, PREDICTIONS_LOG_FILE, os.path.join(ARCHIVE_DIR, DEFAULT_CHANNEL)):
+        if os.path.exists(path):
+            os.replace(path, path + '.migrated')
+
+def _rows(records):
+    # raw_text reste NULL ici : il va dans raw_texts (_raw_rows)
+    return [
+        (
+            p['message_id'], p['numero'], p['couleur'], p['statut'], None, p['date'],
+            p.get('couleur_norm') or normalize_couleur(p['couleur']),
+            p.get('outcome') or normalize_statut(p['statut'])
+        )
+        for p in records
+    ]
+
+def _bump_version(conn):
+    # Toute écriture de predictions change la version (cache des rapports)
+    conn.execute('UPDATE last_sync SET data_version = data_version + 1 WHERE id = 1')
+
+def _codec(channel):
+    """Version et dictionnaire des nouvelles écritures : le dernier appris, sinon texte en clair"""
+    zdicts = _zdicts[channel or DEFAULT_CHANNEL]
+    version = max(zdicts)
+    return (version, zdicts[version]) if version > 1 else (PLAIN, None)
 
-def save_prediction(message_id, numero, couleur, statut, raw_text):
-    with get_db() as conn:
+def _raw_rows(records, channel):
+    version, zdict = _codec(channel)
+    return [(p['message_id'], compress_text(p['raw_text'], version, zdict)) for p in records]
+
+def _train_dictionary(channel):
+    """Dès ZDICT_MIN_TEXTS textes stockés : dictionnaire appris sur les plus récents,
+    puis les textes encore en clair sont recompressés avec lui"""
+    zdicts = _zdicts[channel or DEFAULT_CHANNEL]
+    if max(zdicts) > 1:
+        return
+    with get_db(channel) as conn:
+        if max(zdicts) > 1:
+            return
+        rows = conn.execute(
+            'SELECT data FROM raw_texts WHERE data IS NOT NULL ORDER BY message_id DESC LIMIT ?',
+            (ZDICT_MIN_TEXTS,)
+        ).fetchall()
+        if len(rows) < ZDICT_MIN_TEXTS:
+            return
+        version = 2
+        zdict = build_dictionary([decompress_text(r[0], zdicts) for r in rows])
+        conn.execute('INSERT INTO zdicts (version, data) VALUES (?, ?)', (version, zdict))
+        plain = conn.execute("SELECT message_id, data FROM raw_texts WHERE substr(data, 1, 1) = x'00'").fetchall()
+        conn.executemany(
+            'UPDATE raw_texts SET data = ? WHERE message_id = ?',
+            [(compress_text(decompress_text(r[1]), version, zdict), r[0]) for r in plain]
+        )
+        zdicts[version] = zdict
+
+def add_predictions(records, channel=None):
+    """Insère un lot en une transaction. Retourne le nombre ajouté."""
+    rows = _rows(records)
+    if not rows:
+        return 0
+    with get_db(channel) as conn:
+        # rowcount ne compte pas les écritures des triggers de stats
+        cursor = conn.executemany('''
+            INSERT OR IGNORE INTO predictions 
+            (message_id, numero, couleur, statut, raw_text, date, couleur_norm, outcome)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        added = cursor.rowcount
+        conn.executemany(
+            'INSERT OR IGNORE INTO raw_texts (message_id, data) VALUES (?, ?)', _raw_rows(records, channel)
+        )
+        if added:
+            _bump_version(conn)
+    _train_dictionary(channel)
+    return added
+
+def upsert_predictions(records, channel=None):
+    """Ajoute ou met à jour (statut édité). Retourne le nombre de lignes modifiées."""
+    rows = _rows(records)
+    if not rows:
+        return 0
+    with get_db(channel) as conn:
+        cursor = conn.executemany('''
+            INSERT INTO predictions 
+            (message_id, numero, couleur, statut, raw_text, date, couleur_norm, outcome)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (message_id) DO UPDATE SET
+                numero = excluded.numero,
+                couleur = excluded.couleur,
+                statut = excluded.statut,
+                raw_text = excluded.raw_text,
+                couleur_norm = excluded.couleur_norm,
+                outcome = excluded.outcome
+            WHERE predictions.statut IS NOT excluded.statut
+               OR predictions.couleur IS NOT excluded.couleur
+               OR predictions.numero IS NOT excluded.numero
+        ''', rows)
+        changed = cursor.rowcount
+        conn.executemany('''
+            INSERT INTO raw_texts (message_id, data) VALUES (?, ?)
+            ON CONFLICT (message_id) DO UPDATE SET data = excluded.data
+            WHERE raw_texts.data IS NOT excluded.data
+        ''', _raw_rows(records, channel))
+        if changed:
+            _bump_version(conn)
+    _train_dictionary(channel)
+    return changed
+
+def add_prediction(message_id, numero, couleur, statut, raw_text, date=None, channel=None):
+    return add_predictions([
+        make_prediction(message_id, numero, couleur, statut, raw_text, date)
+    ], channel=channel) == 1
+
+def save_prediction(message_id, numero, couleur, statut, raw_text, channel=None):
+    with get_db(channel) as conn:
         conn.execute('''
             INSERT OR REPLACE INTO predictions 
-            (message_id, numero, couleur, statut, raw_text, date)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (message_id, numero, couleur, statut, raw_text, datetime.now()))
-
-def get_predictions(filters=None):
-    with get_db() as conn:
-        query = "SELECT * FROM predictions WHERE 1=1"
-        params = []
-        
-        if filters:
-            if filters.get('couleur'):
-                query += " AND couleur LIKE ?"
-                params.append(f"%{filters['couleur']}%")
-            if filters.get('statut'):
-                query += " AND statut LIKE ?"
-                params.append(f"%{filters['statut']}%")
-            if filters.get('numero'):
-                query += " AND numero = ?"
-                params.append(filters['numero'])
-        
-        query += " ORDER BY message_id DESC"
-        
-        cursor = conn.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
-
-def get_last_sync():
-    with get_db() as conn:
+            (message_id, numero, couleur, statut, raw_text, date, couleur_norm, outcome)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            message_id, numero, couleur, statut, None, datetime.now().isoformat(),
+            normalize_couleur(couleur), normalize_statut(statut)
+        ))
+        conn.execute(
+            'INSERT OR REPLACE INTO raw_texts (message_id, data) VALUES (?, ?)',
+            (message_id, compress_text(raw_text, *_codec(channel)))
+        )
+        _bump_version(conn)
+
+def _where(filters):
+    """Clause WHERE sur les colonnes indexées"""
+    f = normalize_filters(filters)
+    clauses, params = [], []
+    if 'couleur_norm' in f:
+        clauses.append('couleur_norm = ?')
+        params.append(f['couleur_norm'])
+    if 'outcome' in f:
+        clauses.append('outcome = ?')
+        params.append(f['outcome'])
+    if 'numero' in f:
+        clauses.append('numero = ?')
+        params.append(f['numero'])
+    if 'date_from' in f:
+        clauses.append('date >= ?')
+        params.append(f['date_from'])
+    if 'date_to' in f:
+        clauses.append('date < ?')
+        params.append(f['date_to'])
+    where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+    return where, params
+
+def _source(columns):
+    """Expressions SELECT et FROM : raw_texts n'est joint que si raw_text est demandé"""
+    if 'raw_text' not in columns:
+        return ', '.join(columns), 'predictions'
+    select = ', '.join('raw_texts.data' if c == 'raw_text' else c for c in columns)
+    return select, 'predictions LEFT JOIN raw_texts USING (message_id)'
+
+def get_predictions(filters=None, channel=None):
+    where, params = _where(filters)
+    select, source = _source(COLUMNS)
+    with get_db(channel) as conn:
+        cursor = conn.execute(
+            f"SELECT {select} FROM {source}{where} ORDER BY message_id DESC", params
+        )
+        rows = [dict(zip(COLUMNS, row)) for row in cursor.fetchall()]
+    zdicts = _zdicts[channel or DEFAULT_CHANNEL]
+    for row in rows:
+        row['raw_text'] = decompress_text(row['raw_text'], zdicts)
+    return rows
+
+def get_columns(columns, filters=None, channel=None):
+    """Colonnes demandées en listes parallèles, triées par message_id croissant"""
+    if any(c not in COLUMNS for c in columns):
+        raise ValueError(f"Colonne inconnue: {columns}")
+    where, params = _where(filters)
+    select, source = _source(columns)
+    with get_db(channel) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None  # tuples bruts, sans sqlite3.Row
+        rows = cursor.execute(
+            f"SELECT {select} FROM {source}{where} ORDER BY message_id", params
+        ).fetchall()
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    result = {c: list(v) for c, v in zip(columns, values)}
+    if 'raw_text' in result:
+        zdicts = _zdicts[channel or DEFAULT_CHANNEL]
+        result['raw_text'] = [decompress_text(t, zdicts) for t in result['raw_text']]
+    return result
+
+def iter_predictions(filters=None, columns=None, after_id=None, limit=None, descending=True,
+                     page_size=ITER_PAGE_SIZE, channel=None):
+    """Parcourt les prédictions par pages (keyset sur message_id), mémoire constante.
+
+    `columns` : projection, `after_id` : reprise après cet id dans l'ordre de
+    parcours, `limit` : nombre max de lignes. Le verrou n'est tenu que par page.
+    """
+    columns = tuple(columns or COLUMNS)
+    if any(c not in COLUMNS for c in columns):
+        raise ValueError(f"Colonne inconnue: {columns}")
+    select = columns if 'message_id' in columns else ('message_id',) + columns
+    key = select.index('message_id')
+    expressions, source = _source(select)
+    where, params = _where(filters)
+    op, order = ('<', 'DESC') if descending else ('>', 'ASC')
+    
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        clauses, args = where, list(params)
+        if after_id is not None:
+            clauses += (' AND ' if where else ' WHERE ') + f'message_id {op} ?'
+            args.append(after_id)
+        with get_db(channel) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(
+                f"SELECT {expressions} FROM {source}{clauses} ORDER BY message_id {order} LIMIT ?",
+                args + [size]
+            ).fetchall()
+        zdicts = _zdicts[channel or DEFAULT_CHANNEL]
+        for row in rows:
+            yield {
+                c: decompress_text(row[i], zdicts) if c == 'raw_text' else row[i]
+                for i, c in enumerate(select) if c in columns
+            }
+        if len(rows) < size:
+            return
+        after_id = rows[-1][key]
+        if remaining is not None:
+            remaining -= len(rows)
+
+def pending_ids(limit=None, channel=None):
+    """ids des prédictions en attente, les plus récentes d'abord (index outcome, message_id)"""
+    with get_db(channel) as conn:
+        rows = conn.execute(
+            'SELECT message_id FROM predictions WHERE outcome = ? ORDER BY message_id DESC LIMIT ?',
+            (EN_ATTENTE, -1 if limit is None else limit)
+        ).fetchall()
+    return [r[0] for r in rows]
+
+def count_predictions(filters=None, channel=None):
+    """Nombre de prédictions filtrées, sans lire les lignes"""
+    where, params = _where(filters)
+    with get_db(channel) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM predictions{where}", params).fetchone()[0]
+
+def get_last_sync(channel=None):
+    with get_db(channel) as conn:
         row = conn.execute('SELECT * FROM last_sync WHERE id = 1').fetchone()
         return dict(row) if row else {'last_message_id': 0}
 
-def update_last_sync(message_id):
-    with get_db() as conn:
+def data_version(channel=None):
+    """Compteur d'écritures du canal, incrémenté par chaque ajout, mise à jour ou effacement"""
+    with get_db(channel) as conn:
+        return conn.execute('SELECT data_version FROM last_sync WHERE id = 1').fetchone()[0]
+
+def update_last_sync(message_id, oldest_message_id=None, backfill_done=None, channel=None):
+    """Point de contrôle : plus haut id traité, et pour /fullsync le plus bas"""
+    with get_db(channel) as conn:
         conn.execute('''
             UPDATE last_sync 
-            SET last_message_id = ?, sync_date = ?
+            SET last_message_id = ?, sync_date = ?,
+                oldest_message_id = COALESCE(?, oldest_message_id),
+                backfill_done = COALESCE(?, backfill_done)
             WHERE id = 1
-        ''', (message_id, datetime.now()))
+        ''', (message_id, datetime.now().isoformat(), oldest_message_id, backfill_done))
 
-def get_stats():
-    with get_db() as conn:
-        total = conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
-        return {'total': total}
+def get_stats(channel=None):
+    agg = empty_aggregates()
+    with get_db(channel) as conn:
+        for row in conn.execute('SELECT scope, key, outcome, n FROM stats WHERE n > 0'):
+            agg[row['scope']].setdefault(row['key'], {})[row['outcome']] = row['n']
+    return summarize(agg)
+
+def compact(channel=None):
+    """Journal WAL reversé dans la base puis tronqué : le disque ne garde que la base"""
+    with get_db(channel) as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+def clear_all(channel=None):
+    with get_db(channel) as conn:
+        conn.execute('DELETE FROM predictions')
+        conn.execute('DELETE FROM raw_texts')
+        conn.execute('DELETE FROM stats')
+        conn.execute('''
+            UPDATE last_sync
+            SET last_message_id = 0, sync_date = NULL, oldest_message_id = 0, backfill_done = 0,
+                data_version = data_version + 1
+            WHERE id = 1
+        ''')
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from datetime import datetime
+from config import HEALTH_REFRESH_INTERVAL, CHANNELS, DEFAULT_CHANNEL
+import telegram_client
+
+logger = logging.getLogger(__name__)
+
+# Les sondes ne lisent jamais le stockage : /health répond une constante,
+# /ready sert un instantané recalculé en arrière-plan
+STARTED = datetime.now().isoformat()
+LIVENESS = {'status': 'ok', 'bot': 'VIP_KOUAME_PREDICTIONS', 'started': STARTED}
+
+_snapshot = {'ready': False, 'predictions': None, 'last_message_id': None, 'sync_date': None,
+             'channels': {}, 'telethon_connected': False, 'bot_polling': False, 'refreshed': None}
+_application = None
+_loop = None
+_wake = None
+
+def set_application(application):
+    """Application python-telegram-bot dont on suit l'état du polling"""
+    global _application
+    _application = application
+
+def readiness():
+    return dict(_snapshot)
+
+def _collect():
+    """Lecture du stockage (dans un thread, hors de la boucle)"""
+    from storage import get_stats, get_last_sync
+    channels = {}
+    for channel in CHANNELS:
+        state = get_last_sync(channel)
+        channels[channel] = {
+            'predictions': get_stats(channel)['total'],
+            'last_message_id': state.get('last_message_id', 0),
+            'sync_date': state.get('sync_date'),
+        }
+    default = channels[DEFAULT_CHANNEL]
+    return {
+        'predictions': sum(c['predictions'] for c in channels.values()),
+        'last_message_id': default['last_message_id'],
+        'sync_date': default['sync_date'],
+        'channels': channels,
+    }
+
+async def refresh():
+    try:
+        data = await asyncio.to_thread(_collect)
+    except Exception as e:
+        logger.error(f"Instantané /ready: {e}")
+        data = {}
+    polling = bool(_application and _application.updater and _application.updater.running)
+    _snapshot.update(data)
+    _snapshot.update(
+        ready=bool(data) and polling,
+        telethon_connected=telegram_client.is_connected(),
+        bot_polling=polling,
+        refreshed=datetime.now().isoformat(),
+    )
+
+def request_refresh():
+    """Demande un rafraîchissement après une écriture (appelable depuis un thread)"""
+    if _loop is not None and _wake is not None:
+        _loop.call_soon_threadsafe(_wake.set)
+
+async def run():
+    """Boucle de rafraîchissement : toutes les N secondes ou sur demande"""
+    global _loop, _wake
+    _loop = asyncio.get_running_loop()
+    _wake = asyncio.Event()
+    while True:
+        await refresh()
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=HEALTH_REFRESH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
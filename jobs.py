@@ -0,0 +1,57 @@
+import asyncio
+
+class Coordinator:
+    """Tâches lourdes une à la fois : sync, fullsync, réconciliation, effacement, rapport.
+
+    Une demande identique (même clé) à une tâche en cours ou en file la rejoint
+    et reçoit le même résultat ; une demande différente attend son tour, dans
+    l'ordre d'arrivée. Commandes et tâches planifiées passent toutes par ici.
+    """
+
+    def __init__(self):
+        self._lock = None
+        self._jobs = {}  # clé -> future partagée (en cours ou en file)
+        self.current = None
+
+    def state(self, key):
+        """'running', 'queued' ou None"""
+        if key not in self._jobs:
+            return None
+        return 'running' if key == self.current else 'queued'
+
+    async def run(self, key, factory):
+        """Exécute la coroutine `factory()` sous le verrou commun. Retourne son résultat."""
+        job = self._jobs.get(key)
+        if job is not None:
+            # shield : un appelant qui abandonne n'annule pas la tâche des autres
+            return await asyncio.shield(job)
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        job = self._jobs[key] = asyncio.get_running_loop().create_future()
+        job.add_done_callback(_consume)
+        try:
+            async with self._lock:
+                self.current = key
+                try:
+                    result = await factory()
+                finally:
+                    self.current = None
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+        except Exception as e:
+            job.set_exception(e)
+            raise
+        else:
+            job.set_result(result)
+            return result
+        finally:
+            del self._jobs[key]
+
+def _consume(future):
+    # L'exception est déjà relancée chez l'appelant : pas d'avertissement asyncio
+    if not future.cancelled():
+        future.exception()
+
+coordinator = Coordinator()
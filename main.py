@@ -1,27 +1,33 @@
 import asyncio
+import importlib
 import logging
 from aiohttp import web
-from datetime import datetime
-from config import PORT
-from bot_handler import setup_bot
+from config import PORT, REPORT_USE_PROCESSES
+import health as health_probe
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 async def health(request):
-    from storage import get_stats
-    s = get_stats()
-    return web.json_response({
-        'status': 'ok',
-        'bot': 'VIP_KOUAME_PREDICTIONS',
-        'predictions': s['total'],
-        'time': str(datetime.now())
-    })
+    """Liveness : réponse constante, aucun accès au stockage"""
+    return web.json_response(health_probe.LIVENESS)
+
+async def ready(request):
+    """Readiness : dernier instantané calculé en arrière-plan"""
+    snapshot = health_probe.readiness()
+    return web.json_response(snapshot, status=200 if snapshot['ready'] else 503)
+
+async def metrics(request):
+    from metrics import render
+    return web.Response(text=render(), content_type='text/plain', charset='utf-8',
+                        headers={'X-Content-Type-Options': 'nosniff'})
 
 async def web_server():
     app = web.Application()
     app.router.add_get('/', health)
     app.router.add_get('/health', health)
+    app.router.add_get('/ready', ready)
+    app.router.add_get('/metrics', metrics)
     
     runner = web.AppRunner(app)
     await runner.setup()
@@ -29,16 +35,48 @@ async def web_server():
     await site.start()
     logger.info(f"Web server started on port {PORT}")
 
+def warm_up():
+    """Charge en arrière-plan ce que les premières commandes vont demander"""
+    # Telethon (écoute, /sync) et numpy (/analyse, instantanés)
+    for name in ('telethon', 'telethon.errors', 'analytics', 'snapshot'):
+        importlib.import_module(name)
+    if not REPORT_USE_PROCESSES:
+        # Rapports dans un thread du process : ReportLab aussi
+        importlib.import_module('pdf_generator')
+
 async def main():
+    # Le port est ouvert avant tout import lourd : /health répond pendant le démarrage
     await web_server()
     
-    application = setup_bot()
+    # Import du bot dans un thread : la boucle continue de servir /health
+    bot_handler = await asyncio.to_thread(importlib.import_module, 'bot_handler')
+    scraper = bot_handler.scraper
+    
+    application = bot_handler.setup_bot()
     await application.initialize()
     await application.start()
     await application.updater.start_polling(allowed_updates=['message'])
     
+    health_probe.set_application(application)
+    refresher = asyncio.create_task(health_probe.run())
+    
+    # Synchronisation périodique et rapport quotidien
+    import scheduler
+    scheduled = scheduler.start(application)
+    
     logger.info("Bot VIP KOUAMÉ démarré!")
     
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception as e:
+        logger.error(f"Préchauffage: {e}")
+    
+    # Ingestion en direct (nouveaux messages et statuts édités)
+    try:
+        await scraper.listen()
+    except Exception as e:
+        logger.error(f"Écoute du canal indisponible: {e}")
+    
     while True:
         await asyncio.sleep(3600)
 
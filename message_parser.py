@@ -0,0 +1,40 @@
+import re
+from normalize import make_prediction
+
+# Pré-filtre littéral : "PRÉDICTION" / "PREDICTION" / "prédiction"... contiennent tous
+# "ICTION" ou "iction" ; les autres messages du canal sont rejetés sans regex.
+# Ensuite chaque champ est cherché à partir de la fin du précédent, la valeur
+# bornée à sa ligne : pas de .*? DOTALL qui balaie tout le texte.
+NUMERO = re.compile(r'PR[ÉEé]DICTION\s*#\s*(\d+)', re.IGNORECASE)
+COULEUR = re.compile(r'Couleur[ \t]*:[ \t]*([^\n]+?)[ \t]*(?=Statut|\n|$)', re.IGNORECASE)
+STATUT = re.compile(r'Statut[ \t]*:[ \t]*([^\n]+)', re.IGNORECASE)
+
+def parse_text(text):
+    """(numero, couleur, statut) d'un message de prédiction, ou None"""
+    if not text or not ('ICTION' in text or 'iction' in text or 'Iction' in text):
+        return None
+    numero = NUMERO.search(text)
+    if not numero:
+        return None
+    couleur = COULEUR.search(text, numero.end())
+    if not couleur:
+        return None
+    statut = STATUT.search(text, couleur.end())
+    if not statut:
+        return None
+    return numero.group(1), couleur.group(1).strip(), statut.group(1).strip()
+
+def parse_message(message):
+    """Prédiction extraite d'un message Telegram (couleur et statut normalisés), ou None"""
+    parsed = parse_text(message.text)
+    if not parsed:
+        return None
+    numero, couleur, statut = parsed
+    return make_prediction(
+        message_id=message.id,
+        numero=numero,
+        couleur=couleur,
+        statut=statut,
+        raw_text=message.text[:500],
+        date=message.date.isoformat() if message.date else None
+    )
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Métriques en mémoire au format texte Prometheus, sans dépendance :
+# un incrément = un verrou et une addition, assez léger pour la production.
+# Les écritures arrivent des threads (stockage, parsing) et de la boucle asyncio.
+_lock = threading.Lock()
+_registry = []
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LONG_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+ROW_BUCKETS = (10, 100, 1000, 5000, 10000, 50000, 100000, 500000)
+
+def _labels(names, values, extra=''):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labels)
+
+    def inc(self, n=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            h = self._values.get(key)
+            if h is None:
+                # [compte par seau (+Inf en dernier), somme, total]
+                h = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            h[0][bisect_left(self.buckets, value)] += 1
+            h[1] += value
+            h[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        for key, (counts, total, n) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {n}"
+
+def timed(histogram, errors=None, **labels):
+    """Décorateur (fonction ou coroutine) : durée dans `histogram`, exceptions dans `errors`"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except BaseException:
+                    if errors is not None:
+                        errors.inc(**labels)
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start, **labels)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                if errors is not None:
+                    errors.inc(**labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+def render():
+    """Toutes les métriques au format d'exposition texte (GET /metrics)"""
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+# Synchronisation du canal
+SYNC_RUNS = Counter('sync_runs_total', "Synchronisations terminées", ('mode', 'channel', 'result'))
+SYNC_DURATION = Histogram('sync_duration_seconds', "Durée d'une synchronisation", ('mode', 'channel'), LONG_BUCKETS)
+SYNC_SCANNED = Counter('sync_messages_scanned_total', "Messages lus dans l'historique", ('mode', 'channel'))
+SYNC_MATCHED = Counter('sync_predictions_matched_total', "Messages reconnus comme prédictions", ('mode', 'channel'))
+SYNC_WRITTEN = Counter('sync_predictions_written_total', "Nouvelles prédictions écrites", ('mode', 'channel'))
+SYNC_RATE = Gauge('sync_messages_per_second', "Débit de la dernière synchronisation", ('mode', 'channel'))
+SYNC_HIT_RATIO = Gauge(
+    'sync_parse_hit_ratio', "Part des messages reconnus (dernière synchronisation)", ('mode', 'channel')
+)
+FLOOD_WAITS = Counter('sync_floodwait_total', "Attentes FloodWait subies")
+FLOOD_WAIT_SECONDS = Counter('sync_floodwait_seconds_total', "Secondes passées en attente FloodWait")
+LIVE_MESSAGES = Counter('listen_predictions_total', "Prédictions reçues en direct", ('result',))
+
+# Stockage
+STORAGE_SECONDS = Histogram('storage_operation_seconds', "Latence des lectures et écritures", ('op',))
+
+# Rapports PDF
+PDF_SECONDS = Histogram('pdf_generate_seconds', "Durée de génération d'un rapport", (), LONG_BUCKETS)
+PDF_ROWS = Histogram('pdf_rows', "Lignes par rapport", (), ROW_BUCKETS)
+
+# Commandes du bot
+COMMAND_SECONDS = Histogram('bot_command_seconds', "Latence des commandes", ('command',), LONG_BUCKETS)
+COMMAND_ERRORS = Counter('bot_command_errors_total', "Commandes en erreur", ('command',))
@@ -0,0 +1,91 @@
+import unicodedata
+from datetime import datetime, timedelta
+
+# Résultat canonique d'une prédiction
+GAGNE = 'gagne'
+PERDU = 'perdu'
+EN_ATTENTE = 'attente'
+OUTCOMES = (GAGNE, PERDU, EN_ATTENTE)
+
+# Couleurs de cartes : symboles puis mots (sans accents)
+SYMBOLES = {
+    '♠': 'pique', '♤': 'pique',
+    '♣': 'trefle', '♧': 'trefle',
+    '♥': 'coeur', '♡': 'coeur', '❤': 'coeur',
+    '♦': 'carreau', '♢': 'carreau',
+}
+MOTS = {
+    'pique': 'pique',
+    'trefle': 'trefle',
+    'coeur': 'coeur',
+    'carreau': 'carreau',
+}
+
+def strip_accents(text):
+    """Minuscules sans accents ('Cœur Gagné' -> 'coeur gagne')"""
+    text = text.lower().replace('œ', 'oe')
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', text)
+        if not unicodedata.combining(c)
+    )
+
+def normalize_couleur(text):
+    """Couleur canonique : pique, trefle, coeur, carreau (sinon texte simplifié)"""
+    if not text:
+        return ''
+    for symbole, couleur in SYMBOLES.items():
+        if symbole in text:
+            return couleur
+    simple = strip_accents(text)
+    for mot, couleur in MOTS.items():
+        if mot in simple:
+            return couleur
+    return ' '.join(simple.split())
+
+def normalize_statut(text):
+    """Résultat canonique : gagne, perdu ou attente"""
+    if not text:
+        return EN_ATTENTE
+    simple = strip_accents(text)
+    if 'gagn' in simple or '✅' in text:
+        return GAGNE
+    if 'perd' in simple or '❌' in text:
+        return PERDU
+    return EN_ATTENTE
+
+def normalize_filters(filters):
+    """Convertit les filtres saisis (/filter) en valeurs canoniques"""
+    result = {}
+    if not filters:
+        return result
+    if filters.get('couleur'):
+        result['couleur_norm'] = normalize_couleur(filters['couleur'])
+    if filters.get('statut'):
+        result['outcome'] = normalize_statut(filters['statut'])
+    if filters.get('numero'):
+        result['numero'] = str(filters['numero']).lstrip('#')
+    if filters.get('date_from'):
+        # Validée comme date_to : une date illisible est refusée, pas comparée en texte
+        result['date_from'] = datetime.fromisoformat(str(filters['date_from'])[:10]).date().isoformat()
+    if filters.get('date_to'):
+        # Borne incluse : jusqu'au lendemain exclu
+        day = datetime.fromisoformat(str(filters['date_to'])[:10]).date()
+        result['date_to'] = (day + timedelta(days=1)).isoformat()
+    return result
+
+# Colonnes d'une prédiction, communes aux deux backends
+COLUMNS = ('message_id', 'numero', 'couleur', 'statut', 'raw_text', 'date', 'couleur_norm', 'outcome')
+# Champs mis à jour quand un message du canal est édité
+UPDATABLE = ('numero', 'couleur', 'statut', 'raw_text', 'couleur_norm', 'outcome')
+
+def make_prediction(message_id, numero, couleur, statut, raw_text, date=None):
+    return {
+        'message_id': message_id,
+        'numero': numero,
+        'couleur': couleur,
+        'statut': statut,
+        'raw_text': raw_text,
+        'date': date or datetime.now().isoformat(),
+        'couleur_norm': normalize_couleur(couleur),
+        'outcome': normalize_statut(statut)
+    }
@@ -1,67 +1,139 @@
 from datetime import datetime
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from normalize import GAGNE, PERDU, normalize_statut
 
-def generate_pdf(predictions, filters=None):
-    """Génère le PDF des prédictions"""
+# Mise en page : lignes de hauteur fixe, une Table par page
+MARGIN = 40
+ROW_HEIGHT = 18
+TITLE_HEIGHT = 80
+COL_WIDTHS = [50, 80, 120, 150, 80]
+HEADER = ['#', 'Numéro', 'Couleur', 'Statut', 'Date']
+# Seules colonnes lues par le rapport (projection du curseur de stockage)
+COLUMNS = ('numero', 'couleur', 'statut', 'date', 'outcome')
+
+BASE_STYLE = [
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#2874a6')),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('GRID', (0,0), (-1,-1), 1, colors.grey),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('FONTSIZE', (0,0), (-1,-1), 9),
+]
+STATUT_COLORS = {GAGNE: colors.green, PERDU: colors.red}
+
+def _rows_per_page(height, first):
+    available = height - 2 * MARGIN - (TITLE_HEIGHT if first else 0)
+    return int(available // ROW_HEIGHT) - 1  # moins l'en-tête
+
+def _draw_table(canv, rows, outcomes, top):
+    """Dessine une page de tableau ; le statut est coloré par commandes de style"""
+    style = list(BASE_STYLE)
+    for i, outcome in enumerate(outcomes, 1):
+        style.append(('TEXTCOLOR', (3,i), (3,i), STATUT_COLORS.get(outcome, colors.orange)))
+
+    table = Table([HEADER] + rows, colWidths=COL_WIDTHS, rowHeights=ROW_HEIGHT)
+    table.setStyle(TableStyle(style))
+    width, height = table.wrapOn(canv, 0, 0)
+    table.drawOn(canv, (A4[0] - width) / 2, top - height)
+
+def _draw_footer(canv, page):
+    canv.setFont('Helvetica', 8)
+    canv.setFillColor(colors.grey)
+    canv.drawCentredString(A4[0] / 2, MARGIN / 2, f"Page {page}")
+
+def _draw_analysis(canv, lines, page):
+    """Section d'analyse (texte) sur une ou plusieurs pages après le tableau"""
+    width, height = A4
+    y = height - MARGIN - 18
+    canv.setFont('Helvetica-Bold', 14)
+    canv.setFillColor(colors.HexColor('#1a5276'))
+    canv.drawString(MARGIN, y, "ANALYSE")
+    y -= 24
+    canv.setFont('Helvetica', 9)
+    canv.setFillColor(colors.black)
+    for line in lines:
+        if y < MARGIN:
+            _draw_footer(canv, page)
+            canv.showPage()
+            page += 1
+            y = height - MARGIN - 18
+            canv.setFont('Helvetica', 9)
+            canv.setFillColor(colors.black)
+        canv.drawString(MARGIN, y, line)
+        y -= 13
+    _draw_footer(canv, page)
+    canv.showPage()
+
+def generate_pdf(predictions, filters=None, progress_callback=None, analysis=None):
+    """Génère le PDF des prédictions.
+
+    `predictions` peut être une liste ou n'importe quel itérable (curseur) :
+    le tableau est émis page par page, la mémoire reste bornée.
+    `progress_callback(lignes)` est appelé après chaque page et à la fin.
+    `analysis` : lignes de texte ajoutées dans une section finale.
+    """
     filename = f"/tmp/rapport_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize="A4")
-    styles = getSampleStyleSheet()
-    elements = []
-    
+    width, height = A4
+    canv = canvas.Canvas(filename, pagesize=A4, pageCompression=1)
+
     # Titre
-    title_style = ParagraphStyle(
-        'Title', parent=styles['Heading1'],
-        fontSize=18, textColor=colors.HexColor('#1a5276'),
-        alignment=TA_CENTER
-    )
-    elements.append(Paragraph("RAPPORT DES PRÉDICTIONS VIP", title_style))
-    elements.append(Spacer(1, 20))
-    
-    # Stats
-    total = len(predictions)
-    gagnes = len([p for p in predictions if 'gagn' in p['statut'].lower()])
-    perdus = len([p for p in predictions if 'perd' in p['statut'].lower()])
-    
-    stats = f"Total: {total} | Gagnés: {gagnes} | Perdus: {perdus}"
-    elements.append(Paragraph(stats, styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Tableau
-    if predictions:
-        data = [['#', 'Numéro', 'Couleur', 'Statut', 'Date']]
-        
-        for i, p in enumerate(predictions[:1000], 1):
-            date_str = p['date'][:10] if isinstance(p['date'], str) else str(p['date'])[:10]
-            
-            # Couleur du statut
-            statut = p['statut']
-            if 'gagn' in statut.lower():
-                statut_html = f"<font color='green'>{statut}</font>"
-            elif 'perd' in statut.lower():
-                statut_html = f"<font color='red'>{statut}</font>"
-            else:
-                statut_html = f"<font color='orange'>{statut}</font>"
-            
-            data.append([
-                str(i),
-                f"#{p['numero']}",
-                p['couleur'],
-                Paragraph(statut_html, styles['Normal']),
-                date_str
-            ])
-        
-        table = Table(data, colWidths=[40, 80, 120, 150, 80])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#2874a6')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('GRID', (0,0), (-1,-1), 1, colors.grey),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ]))
-        elements.append(table)
-    
-    doc.build(elements)
+    canv.setFont('Helvetica-Bold', 18)
+    canv.setFillColor(colors.HexColor('#1a5276'))
+    canv.drawCentredString(width / 2, height - MARGIN - 18, "RAPPORT DES PRÉDICTIONS VIP")
+    # Stats : connues seulement à la fin, dessinées via un formulaire référencé ici
+    canv.doForm('resume')
+
+    total = gagnes = perdus = 0
+    page = 1
+    top = height - MARGIN - TITLE_HEIGHT
+    capacity = _rows_per_page(height, first=True)
+    rows, outcomes = [], []
+
+    for p in predictions:
+        total += 1
+        outcome = p.get('outcome') or normalize_statut(p['statut'])
+        if outcome == GAGNE:
+            gagnes += 1
+        elif outcome == PERDU:
+            perdus += 1
+
+        date_str = p['date'][:10] if isinstance(p['date'], str) else str(p['date'])[:10]
+        rows.append([str(total), f"#{p['numero']}", p['couleur'][:25], p['statut'][:30], date_str])
+        outcomes.append(outcome)
+
+        if len(rows) == capacity:
+            _draw_table(canv, rows, outcomes, top)
+            _draw_footer(canv, page)
+            canv.showPage()
+            if progress_callback:
+                progress_callback(total)
+            page += 1
+            top = height - MARGIN
+            capacity = _rows_per_page(height, first=False)
+            rows, outcomes = [], []
+
+    if rows or page == 1:
+        if rows:
+            _draw_table(canv, rows, outcomes, top)
+        _draw_footer(canv, page)
+        canv.showPage()
+        page += 1
+
+    if analysis:
+        _draw_analysis(canv, analysis, page)
+
+    canv.beginForm('resume')
+    canv.setFont('Helvetica', 10)
+    canv.setFillColor(colors.black)
+    canv.drawString(MARGIN, height - MARGIN - 50, f"Total: {total} | Gagnés: {gagnes} | Perdus: {perdus}")
+    if filters:
+        canv.drawString(MARGIN, height - MARGIN - 65, f"Filtres: {filters}")
+    canv.endForm()
+
+    canv.save()
+    if progress_callback:
+        progress_callback(total)
     return filename
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import time
+from config import PROGRESS_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class ProgressReporter:
+    """Met à jour un message Telegram au plus toutes les PROGRESS_INTERVAL secondes.
+
+    `update()` ne fait que mémoriser les derniers compteurs (les valeurs
+    intermédiaires sont fusionnées) ; l'édition part d'une tâche de fond,
+    la boucle de synchronisation n'attend jamais l'API du bot.
+    """
+    
+    def __init__(self, message, title, interval=PROGRESS_INTERVAL):
+        self.message = message
+        self.title = title
+        self.interval = interval
+        self.counts = {}
+        self.started = time.monotonic()
+        self._dirty = False
+        self._last_text = None
+        self._task = None
+    
+    def start(self):
+        self.started = time.monotonic()
+        self._task = asyncio.create_task(self._loop())
+        return self
+    
+    def update(self, **counts):
+        self.counts.update(counts)
+        self._dirty = True
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def render(self):
+        c = self.counts
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        scanned = c.get('scanned', 0)
+        rate = scanned / elapsed
+        lines = [
+            self.title,
+            f"📨 {scanned} messages lus ({rate:.0f}/s)",
+            f"🎯 {c.get('matched', 0)} prédictions trouvées",
+            f"💾 {c.get('written', 0)} nouvelles enregistrées",
+        ]
+        remaining = c.get('remaining')
+        if remaining and rate > 0:
+            eta = int(remaining / rate)
+            lines.append(f"⏱️ Reste ~{eta // 60} min {eta % 60:02d} s")
+        return '\n'.join(lines)
+    
+    async def _loop(self):
+        delay = self.interval
+        while True:
+            await asyncio.sleep(delay)
+            delay = self.interval
+            if not self._dirty:
+                continue
+            self._dirty = False
+            text = self.render()
+            if text == self._last_text:
+                continue
+            try:
+                await self.message.edit_text(text)
+                self._last_text = text
+            except Exception as e:
+                # RetryAfter : respecter le délai demandé par Telegram
+                retry_after = getattr(e, 'retry_after', None)
+                if retry_after:
+                    delay = float(getattr(retry_after, 'total_seconds', lambda: retry_after)())
+                self._dirty = True
+                logger.debug(f"Progression non affichée: {e}")
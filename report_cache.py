@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from config import REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES, DEFAULT_CHANNEL, ensure_data_dir
+
+logger = logging.getLogger(__name__)
+
+# Rapports PDF déjà générés, réutilisés tant que les données n'ont pas changé.
+# Clé = empreinte (canal, filtres normalisés, version des données) ; l'index
+# garde pour chaque clé le fichier, le total, le file_id Telegram et la date
+# du dernier usage (éviction LRU quand la taille totale dépasse la limite).
+INDEX_FILE = os.path.join(REPORT_CACHE_DIR, 'index.json')
+_lock = threading.Lock()
+
+def data_version(channel=None):
+    """Version des données du canal : change à chaque écriture (nouvelle prédiction,
+    numéro ou statut édité, effacement), même si les totaux restent identiques"""
+    from storage import data_version as storage_version
+    return str(storage_version(channel))
+
+def cache_key(filters=None, channel=None):
+    """Clé du rapport (à calculer hors de la boucle : lit les stats du canal)"""
+    from normalize import normalize_filters
+    key = {
+        'channel': channel or DEFAULT_CHANNEL,
+        'filters': normalize_filters(filters),
+        'version': data_version(channel),
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _load_index():
+    from storage import load_json
+    return load_json(INDEX_FILE, {})
+
+def _save_index(index):
+    from storage import save_json
+    save_json(INDEX_FILE, index)
+
+def _evict(index):
+    """Supprime les rapports les moins récemment servis au-delà de la limite"""
+    total = sum(e['size'] for e in index.values())
+    for key in sorted(index, key=lambda k: index[k]['used']):
+        if total <= REPORT_CACHE_MAX_BYTES:
+            break
+        entry = index.pop(key)
+        total -= entry['size']
+        try:
+            os.remove(entry['path'])
+        except OSError:
+            pass
+
+def lookup(key):
+    """Entrée du cache {'path', 'total', 'file_id', ...} ou None"""
+    with _lock:
+        index = _load_index()
+        entry = index.get(key)
+        if entry is None:
+            return None
+        if not os.path.exists(entry['path']):
+            # Fichier supprimé à la main : l'entrée ne vaut plus rien
+            del index[key]
+            _save_index(index)
+            return None
+        entry['used'] = time.time()
+        _save_index(index)
+        return entry
+
+def store(key, pdf_path, total, channel=None):
+    """Déplace un rapport fraîchement généré dans le cache. Retourne son nouveau chemin,
+    ou None s'il dépasse à lui seul la limite (le fichier reste alors où il est)."""
+    size = os.path.getsize(pdf_path)
+    if size > REPORT_CACHE_MAX_BYTES:
+        logger.info(f"Rapport de {size} octets non gardé en cache")
+        return None
+    ensure_data_dir()
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    path = os.path.join(REPORT_CACHE_DIR, f"{key}.pdf")
+    # /tmp et DATA_DIR peuvent être sur deux disques : pas de simple os.replace
+    shutil.move(pdf_path, path)
+    with _lock:
+        index = _load_index()
+        index[key] = {
+            'path': path,
+            'channel': channel or DEFAULT_CHANNEL,
+            'total': total,
+            'file_id': None,
+            'size': size,
+            'used': time.time(),
+        }
+        _evict(index)
+        _save_index(index)
+    return path
+
+def remember_file_id(key, file_id):
+    """file_id Telegram du document envoyé : les prochains envois ne retéléversent rien"""
+    with _lock:
+        index = _load_index()
+        if key in index:
+            index[key]['file_id'] = file_id
+            _save_index(index)
+
+def forget_file_id(key):
+    """file_id refusé par Telegram : le prochain envoi repartira du fichier"""
+    remember_file_id(key, None)
@@ -0,0 +1,113 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from config import REPORT_USE_PROCESSES, REPORT_PROGRESS_INTERVAL
+from metrics import PDF_SECONDS, PDF_ROWS
+
+class ReportCancelled(Exception):
+    pass
+
+# Compteurs partagés avec le worker (process ou thread)
+_progress = None
+_cancel = None
+
+def _init_worker(progress, cancel):
+    global _progress, _cancel
+    _progress, _cancel = progress, cancel
+
+def _on_progress(rows):
+    _progress.value = rows
+    if _cancel.value:
+        raise ReportCancelled()
+
+def _build(filters, channel=None):
+    """Exécuté dans le worker : lit le stockage du canal et génère le PDF"""
+    from storage import iter_predictions
+    from pdf_generator import generate_pdf, COLUMNS
+    from analytics import analyse, format_analysis
+    
+    _progress.value = 0
+    pdf_path = generate_pdf(
+        iter_predictions(filters, columns=COLUMNS, channel=channel), filters,
+        progress_callback=_on_progress,
+        analysis=format_analysis(analyse(filters, channel=channel))
+    )
+    total = _progress.value
+    if total == 0:
+        os.remove(pdf_path)
+        return None
+    return pdf_path, total
+
+class ReportRunner:
+    def __init__(self):
+        self.executor = None
+        self.progress = None
+        self.cancel_flag = None
+        self.running = False
+    
+    def _ensure_executor(self):
+        if self.executor is not None:
+            return
+        if REPORT_USE_PROCESSES:
+            # spawn : pas de connexion SQLite héritée par fork
+            ctx = multiprocessing.get_context('spawn')
+            self.progress = ctx.Value('i', 0)
+            self.cancel_flag = ctx.Value('b', 0)
+            self.executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=ctx,
+                initializer=_init_worker, initargs=(self.progress, self.cancel_flag)
+            )
+        else:
+            self.progress = multiprocessing.Value('i', 0)
+            self.cancel_flag = multiprocessing.Value('b', 0)
+            self.executor = ThreadPoolExecutor(
+                max_workers=1,
+                initializer=_init_worker, initargs=(self.progress, self.cancel_flag)
+            )
+    
+    async def run(self, filters=None, progress_callback=None, channel=None):
+        """Génère un rapport sans bloquer la boucle. Retourne (chemin, total) ou None."""
+        if self.running:
+            raise RuntimeError("Rapport déjà en cours")
+        
+        self._ensure_executor()
+        self.running = True
+        self.cancel_flag.value = 0
+        self.progress.value = 0
+        
+        try:
+            # generate_pdf tourne dans le worker : la mesure /metrics est faite ici
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, _build, filters, channel)
+            last = None
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=REPORT_PROGRESS_INTERVAL)
+                if done:
+                    result = future.result()
+                    if result is not None:
+                        PDF_SECONDS.observe(time.perf_counter() - started)
+                        PDF_ROWS.observe(result[1])
+                    return result
+                rows = self.progress.value
+                if progress_callback and rows != last:
+                    last = rows
+                    await progress_callback(rows)
+        finally:
+            self.running = False
+    
+    def cancel(self):
+        """Demande l'arrêt du rapport en cours (vérifié à chaque page)"""
+        if not self.running:
+            return False
+        self.cancel_flag.value = 1
+        return True
+    
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+report_runner = ReportRunner()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from config import ADMIN_ID, CHANNELS, SYNC_INTERVAL_MINUTES, DAILY_REPORT_TIME
+from storage import get_stats
+from scraper import scraper
+from auth_manager import auth_manager
+from jobs import coordinator
+from bot_handler import deliver_report
+
+logger = logging.getLogger(__name__)
+
+# Tâches planifiées dans la boucle du bot (comme le rafraîchissement de /ready).
+# Elles passent par le même coordinateur que les commandes : une /sync tapée
+# pendant la synchronisation planifiée la rejoint, /fullsync ou /clear attendent.
+SYNC_KEY = ('sync', tuple(CHANNELS))
+
+async def sync_once():
+    """Synchronisation incrémentale de tous les canaux, si Telethon est connecté"""
+    if not auth_manager.is_connected():
+        return None
+    results, reconciled = await coordinator.run(SYNC_KEY, lambda: scraper.sync_recent(list(CHANNELS)))
+    for channel, r in (*results.items(), *reconciled.items()):
+        if isinstance(r, BaseException):
+            logger.error(f"Synchronisation planifiée ({channel}): {r}")
+    return results, reconciled
+
+async def sync_loop(interval=SYNC_INTERVAL_MINUTES):
+    while True:
+        await asyncio.sleep(interval * 60)
+        try:
+            await sync_once()
+        except Exception as e:
+            logger.error(f"Synchronisation planifiée: {e}")
+
+def seconds_until(hhmm, now=None):
+    """Secondes jusqu'au prochain HH:MM (UTC, comme les dates des messages)"""
+    now = now or datetime.now(timezone.utc)
+    hour, minute = (int(x) for x in hhmm.split(':'))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+def daily_summary(day):
+    lines = [f"🗓️ Résumé du {day}"]
+    for channel in CHANNELS:
+        s = get_stats(channel)['jours'].get(day)
+        prefix = f"{CHANNELS[channel]['name']}: " if len(CHANNELS) > 1 else ""
+        if not s:
+            lines.append(f"• {prefix}aucune prédiction")
+            continue
+        taux = f"{s['taux']}%" if s['taux'] is not None else "N/A"
+        lines.append(
+            f"• {prefix}{s['total']} prédictions, {s['gagnes']} gagnées, "
+            f"{s['perdus']} perdues, {s['en_attente']} en attente ({taux})"
+        )
+    return '\n'.join(lines)
+
+async def daily_report(bot, day=None):
+    """Résumé texte et rapport PDF de la veille (UTC), envoyés à l'admin"""
+    day = day or (datetime.now(timezone.utc).date() - timedelta(days=1)).isoformat()
+    try:
+        # Derniers statuts de la veille avant de compter
+        await sync_once()
+    except Exception as e:
+        logger.error(f"Synchronisation avant le rapport quotidien: {e}")
+
+    await bot.send_message(chat_id=ADMIN_ID, text=await asyncio.to_thread(daily_summary, day))
+    for channel in CHANNELS:
+        try:
+            await deliver_report(bot, {'date_from': day, 'date_to': day}, channel)
+        except Exception as e:
+            logger.error(f"Rapport quotidien ({channel}): {e}")
+
+async def daily_loop(bot, at=DAILY_REPORT_TIME):
+    while True:
+        await asyncio.sleep(seconds_until(at))
+        try:
+            await daily_report(bot)
+        except Exception as e:
+            logger.error(f"Rapport quotidien: {e}")
+
+def start(application):
+    """Lance les tâches planifiées activées. Retourne les tâches asyncio."""
+    tasks = []
+    if SYNC_INTERVAL_MINUTES > 0:
+        tasks.append(asyncio.create_task(sync_loop()))
+    if DAILY_REPORT_TIME:
+        tasks.append(asyncio.create_task(daily_loop(application.bot)))
+    logger.info(f"Planificateur: sync toutes les {SYNC_INTERVAL_MINUTES or '-'} min, rapport quotidien {DAILY_REPORT_TIME or 'désactivé'}")
+    return tasks
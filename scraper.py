@@ -1,72 +1,375 @@
-import re
-from telethon import TelegramClient
-from telethon.tl.types import Channel
-from config import API_ID, API_HASH, SESSION_PATH, CHANNEL_USERNAME
-from storage import add_prediction, get_last_sync, update_last_sync
-
-PATTERN = re.compile(
-    r'PRÉDICTION\s*#(\d+).*?'
-    r'Couleur:\s*([^\n]+).*?'
-    r'Statut:\s*([^\n]+)',
-    re.IGNORECASE | re.DOTALL
+import asyncio
+import logging
+import time
+from config import (
+    CHANNELS, DEFAULT_CHANNEL, SYNC_BATCH_SIZE, SYNC_LIMIT, CHECKPOINT_EVERY, FLOOD_WAIT_MAX,
+    RECONNECT_RETRIES, FETCH_CHUNK_SIZE, PIPELINE_QUEUE_SIZE, RECONCILE_BATCH_SIZE, RECONCILE_LIMIT
+)
+from telegram_client import get_client, ensure_connected, reconnect, get_channel, history_limiter
+from storage import add_predictions, upsert_predictions, get_last_sync, update_last_sync, pending_ids, data_version
+from message_parser import parse_message
+from health import request_refresh
+from metrics import (
+    SYNC_RUNS, SYNC_DURATION, SYNC_SCANNED, SYNC_MATCHED, SYNC_WRITTEN, SYNC_RATE, SYNC_HIT_RATIO,
+    FLOOD_WAITS, FLOOD_WAIT_SECONDS, LIVE_MESSAGES
 )
 
+logger = logging.getLogger(__name__)
+
+# Messages renvoyés par requête d'historique (iter_messages)
+HISTORY_PAGE_SIZE = 100
+# id Telegram -> clé du canal (événements en direct)
+CHANNEL_BY_ID = {c['id']: key for key, c in CHANNELS.items()}
+
+def _parse_chunk(messages):
+    """Analyse d'un paquet de messages (exécutée hors de la boucle asyncio)"""
+    return [p for p in map(parse_message, messages) if p]
+
+def _write_snapshot(channel=None):
+    """Instantané en colonnes pour /analyse et les rapports (numpy chargé ici, pas au démarrage)"""
+    from snapshot import write_snapshot
+    return write_snapshot(channel)
+
+def _snapshot_stale(channel=None):
+    """Vrai si l'instantané manque ou ne correspond plus au stockage (écoute, /clear)"""
+    from snapshot import open_snapshot
+    snap = open_snapshot(channel)
+    return snap is None or not snap.matches(data_version(channel))
+
 class Scraper:
     def __init__(self):
-        self.client = TelegramClient(SESSION_PATH, API_ID, API_HASH)
+        self._listen_client = None
+    
+    async def _authorized_client(self):
+        client = await ensure_connected()
+        try:
+            authorized = await client.is_user_authorized()
+        except (ConnectionError, OSError):
+            # Connexion partagée coupée depuis le dernier usage
+            client = await reconnect()
+            authorized = await client.is_user_authorized()
+        if not authorized:
+            raise RuntimeError("Session Telegram non autorisée : /connect puis /code")
+        return client
+    
+    async def listen(self):
+        """Écoute en continu les nouveaux messages et les éditions des canaux suivis"""
+        if self._listen_client is not None and self._listen_client is get_client():
+            return True
+        
+        try:
+            client = await self._authorized_client()
+        except RuntimeError:
+            logger.info("Écoute du canal inactive : session Telegram non autorisée")
+            return False
+        
+        from telethon import events
+        chats = list(CHANNEL_BY_ID)
+        client.add_event_handler(self._on_message, events.NewMessage(chats=chats))
+        client.add_event_handler(self._on_message, events.MessageEdited(chats=chats))
+        self._listen_client = client
+        logger.info("Écoute du canal démarrée")
+        return True
+    
+    async def _on_message(self, event):
+        """Nouveau message ou statut édité : upsert immédiat"""
+        try:
+            prediction = parse_message(event.message)
+            if not prediction:
+                return
+            channel = CHANNEL_BY_ID.get(event.chat_id, DEFAULT_CHANNEL)
+            # Dans un thread : le verrou du stockage peut être tenu par une sync ou un instantané
+            if await asyncio.to_thread(upsert_predictions, [prediction], channel=channel):
+                LIVE_MESSAGES.inc(result='ecrite')
+                request_refresh()
+                logger.info(f"Prédiction #{prediction['numero']} ({channel}/{event.message.id}) enregistrée")
+            else:
+                LIVE_MESSAGES.inc(result='inchangee')
+        except Exception as e:
+            LIVE_MESSAGES.inc(result='erreur')
+            logger.error(f"Écoute: {e}")
     
-    async def sync(self, full=False, progress_callback=None):
-        """Synchronise le canal VIP DE KOUAMÉ & JOKER"""
-        await self.client.connect()
+    def _record(self, mode, channel, written, elapsed, error):
+        """Compteurs /metrics d'une synchronisation (même interrompue)"""
+        labels = {'mode': mode, 'channel': channel}
+        SYNC_RUNS.inc(result='erreur' if error else 'ok', **labels)
+        request_refresh()
+        SYNC_DURATION.observe(elapsed, **labels)
+        SYNC_SCANNED.inc(written['scanned'], **labels)
+        SYNC_MATCHED.inc(written['matched'], **labels)
+        SYNC_WRITTEN.inc(written['new'], **labels)
+        if elapsed > 0:
+            SYNC_RATE.set(round(written['scanned'] / elapsed, 1), **labels)
+        if written['scanned']:
+            SYNC_HIT_RATIO.set(round(written['matched'] / written['scanned'], 4), **labels)
+    
+    async def sync_all(self, full=False, progress_callback=None, channels=None):
+        """Synchronise plusieurs canaux en parallèle sur la même connexion.
+
+        La progression transmise est la somme des canaux. Retourne
+        {canal: résultat de sync() ou exception}.
+        """
+        channels = list(channels or CHANNELS)
+        progress = {}
+        
+        def reporter(channel):
+            def update(**counts):
+                progress[channel] = counts
+                if progress_callback:
+                    remaining = [c['remaining'] for c in progress.values()]
+                    progress_callback(
+                        **{k: sum(c[k] for c in progress.values()) for k in ('scanned', 'matched', 'written')},
+                        remaining=None if None in remaining else sum(remaining)
+                    )
+            return update
         
-        if not await self.client.is_user_authorized():
-            # Utilise le numéro fourni pour l'authentification
-            await self.client.start(phone=lambda: input("Code reçu par SMS: "))
+        results = await asyncio.gather(
+            *(self.sync(full, reporter(channel), channel=channel) for channel in channels),
+            return_exceptions=True
+        )
+        return dict(zip(channels, results))
+    
+    async def _get_messages(self, client, entity, ids, channel):
+        """Messages par id (None si supprimé), avec FloodWait et reconnexion"""
+        from telethon.errors import FloodWaitError
+        reconnects = 0
+        while True:
+            await history_limiter.wait()
+            try:
+                return await client.get_messages(entity, ids=ids)
+            except FloodWaitError as e:
+                if e.seconds > FLOOD_WAIT_MAX:
+                    raise
+                logger.warning(f"FloodWait {e.seconds}s ({channel}), tous les canaux en pause")
+                FLOOD_WAITS.inc()
+                FLOOD_WAIT_SECONDS.inc(e.seconds + 1)
+                history_limiter.pause(e.seconds + 1)
+            except (ConnectionError, OSError) as e:
+                reconnects += 1
+                if reconnects > RECONNECT_RETRIES:
+                    raise
+                logger.warning(f"Connexion perdue ({e}), reconnexion {reconnects}/{RECONNECT_RETRIES}")
+                client = await reconnect()
+    
+    async def reconcile(self, channel=None):
+        """Relit par id les prédictions restées en attente et enregistre les statuts édités.
+
+        Quelques requêtes get_messages au lieu d'un nouveau parcours de
+        l'historique. Retourne {'checked', 'updated'}.
+        """
+        channel = channel or DEFAULT_CHANNEL
+        started = time.perf_counter()
+        client = await self._authorized_client()
+        entity = await get_channel(channel)
         
+        pending = await asyncio.to_thread(pending_ids, RECONCILE_LIMIT, channel)
+        counts = {'scanned': 0, 'matched': 0, 'new': 0}
+        error = None
         try:
-            # Recherche du canal par nom ou ID
+            for i in range(0, len(pending), RECONCILE_BATCH_SIZE):
+                ids = pending[i:i + RECONCILE_BATCH_SIZE]
+                messages = await self._get_messages(client, entity, ids, channel)
+                predictions = await asyncio.to_thread(_parse_chunk, [m for m in messages if m is not None])
+                counts['scanned'] += len(ids)
+                counts['matched'] += len(predictions)
+                if predictions:
+                    counts['new'] += await asyncio.to_thread(upsert_predictions, predictions, channel)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._record('reconcile', channel, counts, time.perf_counter() - started, error=error is not None)
+        
+        if counts['new']:
+            try:
+                await asyncio.to_thread(_write_snapshot, channel)
+            except Exception as e:
+                logger.error(f"Instantané: {e}")
+        return {'checked': counts['scanned'], 'updated': counts['new']}
+    
+    async def reconcile_all(self, channels=None):
+        """Réconcilie plusieurs canaux en parallèle. Retourne {canal: résultat ou exception}."""
+        channels = list(channels or CHANNELS)
+        results = await asyncio.gather(
+            *(self.reconcile(channel) for channel in channels), return_exceptions=True
+        )
+        return dict(zip(channels, results))
+
+    async def sync_recent(self, channels=None, progress_callback=None):
+        """Synchronisation incrémentale puis réconciliation des canaux synchronisés (/sync, planificateur).
+
+        Retourne ({canal: résultat de sync()}, {canal: résultat de reconcile()}),
+        les erreurs par canal étant des exceptions.
+        """
+        results = await self.sync_all(full=False, progress_callback=progress_callback, channels=channels)
+        # Statuts édités hors écoute : seuls les ids en attente sont relus
+        synced = [c for c, r in results.items() if not isinstance(r, BaseException)]
+        reconciled = await self.reconcile_all(synced) if synced else {}
+        return results, reconciled
+
+    async def sync(self, full=False, progress_callback=None, channel=None):
+        """Synchronise un canal (par défaut VIP DE KOUAMÉ & JOKER).
+
+        `progress_callback(scanned=, matched=, written=, remaining=)` est appelé
+        (sans await) après chaque paquet écrit.
+        """
+        from telethon.errors import FloodWaitError
+        channel = channel or DEFAULT_CHANNEL
+        mode = 'full' if full else 'incremental'
+        started = time.perf_counter()
+        # Client partagé déjà connecté et canal en cache : seul l'historique coûte
+        client = await self._authorized_client()
+        entity = await get_channel(channel)
+        
+        state = await asyncio.to_thread(get_last_sync, channel)
+        # /fullsync reprend vers le passé depuis le dernier point de contrôle
+        oldest = 0 if state.get('backfill_done') else state.get('oldest_message_id', 0)
+        fetched = {'scanned': 0, 'last_id': state.get('last_message_id', 0), 'oldest': oldest, 'error': None}
+        written = {'new': 0, 'scanned': 0, 'matched': 0, 'last_id': fetched['last_id'], 'oldest': oldest}
+        
+        # Files bornées entre les étages : le plus lent impose le rythme
+        raw_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        parsed_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        
+        async def fetch():
+            """Étage 1 : lit l'historique par paquets de messages"""
+            nonlocal client
+            chunk = []
+            reconnects = 0
             try:
-                entity = await self.client.get_entity(CHANNEL_USERNAME)
-            except:
-                # Essayer avec le numéro de téléphone
-                entity = await self.client.get_entity(CHANNEL_USERNAME.replace(" ", ""))
+                while True:
+                    limit = SYNC_LIMIT - fetched['scanned']
+                    # Rythme des requêtes imposé par le limiteur commun à tous les canaux
+                    await history_limiter.wait()
+                    if full:
+                        # Du plus récent au plus ancien, sous le point de contrôle
+                        messages = client.iter_messages(
+                            entity, limit=limit, offset_id=fetched['oldest'], wait_time=0
+                        )
+                    else:
+                        # Du plus ancien au plus récent : le plus haut id traité est sûr
+                        messages = client.iter_messages(
+                            entity, limit=limit, min_id=fetched['last_id'], reverse=True, wait_time=0
+                        )
+                    
+                    try:
+                        async for message in messages:
+                            fetched['scanned'] += 1
+                            if message.id > fetched['last_id']:
+                                fetched['last_id'] = message.id
+                            if full:
+                                fetched['oldest'] = message.id
+                            chunk.append(message)
+                            if len(chunk) >= FETCH_CHUNK_SIZE:
+                                await raw_queue.put(chunk)
+                                chunk = []
+                            if fetched['scanned'] % HISTORY_PAGE_SIZE == 0:
+                                # Page épuisée : la suivante attend son tour
+                                await history_limiter.wait()
+                        break
+                    except FloodWaitError as e:
+                        # Attendre puis reprendre après le dernier message lu
+                        if e.seconds > FLOOD_WAIT_MAX:
+                            raise
+                        logger.warning(f"FloodWait {e.seconds}s ({channel}), tous les canaux en pause")
+                        FLOOD_WAITS.inc()
+                        FLOOD_WAIT_SECONDS.inc(e.seconds + 1)
+                        history_limiter.pause(e.seconds + 1)
+                    except (ConnectionError, OSError) as e:
+                        reconnects += 1
+                        if reconnects > RECONNECT_RETRIES:
+                            raise
+                        logger.warning(f"Connexion perdue ({e}), reconnexion {reconnects}/{RECONNECT_RETRIES}")
+                        client = await reconnect()
+            except Exception as e:
+                # Les étages suivants écrivent quand même ce qui a été lu
+                fetched['error'] = e
+            finally:
+                if chunk:
+                    await raw_queue.put(chunk)
+                await raw_queue.put(None)
+        
+        async def parse():
+            """Étage 2 : analyse des paquets dans un thread"""
+            while (chunk := await raw_queue.get()) is not None:
+                predictions = await asyncio.to_thread(_parse_chunk, chunk)
+                await parsed_queue.put((chunk, predictions))
+            await parsed_queue.put(None)
+        
+        async def write():
+            """Étage 3 : écritures par lots et points de contrôle"""
+            batch = []
+            since_checkpoint = 0
             
-            if not isinstance(entity, Channel):
-                raise ValueError(f"{CHANNEL_USERNAME} n'est pas un canal")
+            async def flush():
+                nonlocal batch
+                if batch:
+                    written['new'] += await asyncio.to_thread(add_predictions, batch, channel)
+                    batch = []
             
-            total = 0
-            last_id = 0
-            min_id = 0 if full else get_last_sync().get('last_message_id', 0)
+            async def checkpoint(backfill_done=None):
+                await flush()
+                if full:
+                    await asyncio.to_thread(
+                        update_last_sync, written['last_id'], oldest_message_id=written['oldest'],
+                        backfill_done=bool(backfill_done), channel=channel
+                    )
+                elif written['last_id'] > 0:
+                    await asyncio.to_thread(update_last_sync, written['last_id'], channel=channel)
             
-            async for message in self.client.iter_messages(entity, limit=50000, min_id=min_id):
-                if not message.text:
-                    continue
+            while (item := await parsed_queue.get()) is not None:
+                chunk, predictions = item
+                batch.extend(predictions)
+                # Les paquets arrivent dans l'ordre de lecture
+                written['scanned'] += len(chunk)
+                written['matched'] += len(predictions)
+                written['last_id'] = max(written['last_id'], max(m.id for m in chunk))
+                if full:
+                    written['oldest'] = chunk[-1].id
                 
-                match = PATTERN.search(message.text)
-                if match:
-                    added = add_prediction(
-                        message_id=message.id,
-                        numero=match.group(1),
-                        couleur=match.group(2).strip(),
-                        statut=match.group(3).strip(),
-                        raw_text=message.text[:500]
+                # Une écriture disque par lot au lieu d'une par message
+                if len(batch) >= SYNC_BATCH_SIZE:
+                    await flush()
+                if progress_callback:
+                    # En backfill, les ids restants sous le plus ancien donnent l'ETA
+                    remaining = min(written['oldest'], SYNC_LIMIT - written['scanned']) if full else None
+                    progress_callback(
+                        scanned=written['scanned'], matched=written['matched'],
+                        written=written['new'], remaining=remaining
                     )
-                    if added:
-                        total += 1
-                
-                if message.id > last_id:
-                    last_id = message.id
-                
-                if total % 100 == 0 and progress_callback:
-                    await progress_callback(total)
+                since_checkpoint += len(chunk)
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    await checkpoint()
+                    since_checkpoint = 0
             
-            if last_id > 0:
-                update_last_sync(last_id)
-            
-            return {'new': total, 'last_id': last_id}
-            
-        finally:
-            await self.client.disconnect()
+            # Historique épuisé avant la limite : le backfill est terminé
+            done = fetched['error'] is None and written['scanned'] < SYNC_LIMIT
+            await checkpoint(backfill_done=done if full else None)
+            return done
+        
+        tasks = [asyncio.create_task(stage()) for stage in (fetch, parse, write)]
+        try:
+            done = (await asyncio.gather(*tasks))[2]
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            self._record(mode, channel, written, time.perf_counter() - started, error=True)
+            raise
+        
+        self._record(mode, channel, written, time.perf_counter() - started, error=fetched['error'] is not None)
+        try:
+            # Instantané en colonnes pour /analyse et les rapports : projection complète
+            # de la table, refaite seulement si quelque chose a changé
+            if written['new'] or await asyncio.to_thread(_snapshot_stale, channel):
+                await asyncio.to_thread(_write_snapshot, channel)
+        except Exception as e:
+            logger.error(f"Instantané: {e}")
+        if fetched['error'] is not None:
+            raise fetched['error']
+        
+        return {
+            'new': written['new'], 'matched': written['matched'], 'scanned': written['scanned'],
+            'last_id': written['last_id'], 'done': done
+        }
 
 scraper = Scraper()
-                
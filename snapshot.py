@@ -0,0 +1,206 @@
+import json
+import mmap
+import os
+from datetime import datetime
+import numpy as np
+from config import SNAPSHOT_FILE, partition_path
+from normalize import normalize_filters
+from aggregates import empty_aggregates, summarize
+
+# Instantané en colonnes, écrit après chaque sync et lu par mmap (lecture seule) :
+#   MAGIC | taille de l'en-tête (uint64) | en-tête JSON | tableaux alignés sur 8 octets
+# message_id int64, numero int32 (-1 si non numérique), ts int64 (secondes, date
+# telle qu'écrite), couleur / statut / couleur_norm / outcome en codes int16 vers
+# les dictionnaires de l'en-tête. raw_text n'y est pas : il reste dans l'archive froide.
+MAGIC = b'PSNAP002'
+ALIGN = 8
+NO_TS = np.iinfo(np.int64).min
+ENCODED = ('couleur', 'statut', 'couleur_norm', 'outcome')
+SOURCE_COLUMNS = ('message_id', 'numero', 'date') + ENCODED
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+def _encode(values):
+    """Dictionnaire trié des valeurs distinctes + codes int16"""
+    labels, codes = np.unique(np.array([v or '' for v in values], dtype=str), return_inverse=True)
+    return [str(l) for l in labels], codes.astype(np.int16)
+
+def _numeros(values):
+    numeros = np.array([str(v) for v in values], dtype='U10')
+    result = np.full(len(numeros), -1, dtype=np.int32)
+    digits = np.char.isdigit(numeros)
+    result[digits] = numeros[digits].astype(np.int32)
+    return result
+
+def _timestamp(value):
+    """Secondes depuis 1970 de la date telle qu'écrite (fuseau ignoré, comme les filtres)"""
+    try:
+        return int(np.datetime64(str(value)[:19].replace(' ', 'T'), 's').astype(np.int64))
+    except ValueError:
+        return NO_TS
+
+def _timestamps(values):
+    try:
+        return np.array([str(v)[:19].replace(' ', 'T') for v in values], dtype='datetime64[s]').astype(np.int64)
+    except ValueError:
+        # Date illisible quelque part : conversion ligne par ligne
+        return np.array([_timestamp(v) for v in values], dtype=np.int64)
+
+def write_snapshot(channel=None):
+    """Écrit l'instantané du canal depuis le stockage (hors de la boucle asyncio). Retourne le nombre de lignes."""
+    from storage import get_columns, get_last_sync, data_version
+    path = partition_path(SNAPSHOT_FILE, channel)
+    # Lue avant les colonnes : une écriture concurrente rend l'instantané périmé, jamais l'inverse
+    version = str(data_version(channel))
+    cols = get_columns(SOURCE_COLUMNS, channel=channel)
+    n = len(cols['message_id'])
+
+    arrays = {
+        'message_id': np.array(cols['message_id'], dtype=np.int64),
+        'numero': _numeros(cols['numero']),
+        'ts': _timestamps(cols['date']),
+    }
+    dictionaries = {}
+    for name in ENCODED:
+        dictionaries[name], arrays[name] = _encode(cols[name])
+
+    layout, position = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, position, len(array)]
+        position = _align(position + array.nbytes)
+    header = json.dumps({
+        'count': n,
+        'last_message_id': get_last_sync(channel).get('last_message_id', 0),
+        'data_version': version,
+        'created': datetime.now().isoformat(),
+        'dictionaries': dictionaries,
+        'arrays': layout,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    base = _align(len(MAGIC) + 8 + len(header))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+        for name, array in arrays.items():
+            f.seek(base + layout[name][1])
+            f.write(array.tobytes())
+        f.truncate(base + position)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return n
+
+class Snapshot:
+    """Vue en lecture seule : tableaux numpy adossés au fichier mappé"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} n'est pas un instantané")
+        size = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 8], 'little')
+        start = len(MAGIC) + 8
+        header = json.loads(self._mmap[start:start + size])
+        base = _align(start + size)
+
+        self.count = header['count']
+        self.last_message_id = header['last_message_id']
+        self.data_version = header.get('data_version')
+        self.created = header['created']
+        self.dictionaries = header['dictionaries']
+        self.arrays = {}
+        for name, (dtype, offset, length) in header['arrays'].items():
+            if length:
+                self.arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=length, offset=base + offset)
+            else:
+                self.arrays[name] = np.empty(0, dtype=dtype)
+
+    def _code(self, column, label):
+        labels = self.dictionaries[column]
+        return labels.index(label) if label in labels else -1
+
+    def mask(self, filters=None):
+        """Masque booléen des lignes retenues par les filtres (None = toutes)"""
+        f = normalize_filters(filters)
+        if not f:
+            return None
+        a = self.arrays
+        mask = np.ones(self.count, dtype=bool)
+        for column in ('couleur_norm', 'outcome'):
+            if column in f:
+                mask &= a[column] == self._code(column, f[column])
+        if 'numero' in f:
+            mask &= a['numero'] == (int(f['numero']) if f['numero'].isdigit() else -2)
+        if 'date_from' in f:
+            mask &= a['ts'] >= _timestamp(f['date_from'])
+        if 'date_to' in f:
+            mask &= a['ts'] < _timestamp(f['date_to'])
+        return mask
+
+    def column(self, name, filters=None):
+        """Colonne filtrée (vue sans copie si aucun filtre)"""
+        mask = self.mask(filters)
+        values = self.arrays[name]
+        return values if mask is None else values[mask]
+
+    def labels(self, name, filters=None):
+        """Colonne encodée décodée en tableau de chaînes"""
+        return np.array(self.dictionaries[name], dtype=object)[self.column(name, filters)]
+
+    def count_rows(self, filters=None):
+        mask = self.mask(filters)
+        return self.count if mask is None else int(mask.sum())
+
+    def stats(self, filters=None):
+        """Même forme que storage.get_stats(), calculée par bincount"""
+        mask = self.mask(filters)
+        outcome = self.arrays['outcome'] if mask is None else self.arrays['outcome'][mask]
+        couleur = self.arrays['couleur_norm'] if mask is None else self.arrays['couleur_norm'][mask]
+        ts = self.arrays['ts'] if mask is None else self.arrays['ts'][mask]
+        outcomes = self.dictionaries['outcome']
+        n_out = len(outcomes)
+
+        agg = empty_aggregates()
+        def add(scope, key, counts):
+            for code, n in enumerate(counts):
+                if n:
+                    agg[scope].setdefault(key, {})[outcomes[code]] = int(n)
+
+        add('total', '', np.bincount(outcome, minlength=n_out))
+        by_couleur = np.bincount(couleur.astype(np.int64) * n_out + outcome, minlength=len(self.dictionaries['couleur_norm']) * n_out)
+        for code, label in enumerate(self.dictionaries['couleur_norm']):
+            add('couleur', label, by_couleur[code * n_out:(code + 1) * n_out])
+        known = ts != NO_TS
+        days, day_codes = np.unique(ts[known] // 86400, return_inverse=True)
+        by_day = np.bincount(day_codes * n_out + outcome[known], minlength=len(days) * n_out)
+        for code, day in enumerate(days):
+            label = str(np.datetime64(int(day), 'D'))
+            add('jour', label, by_day[code * n_out:(code + 1) * n_out])
+        return summarize(agg)
+
+    def matches(self, version):
+        """Vrai si l'instantané correspond encore au stockage (même storage.data_version).
+
+        Les totaux ne suffisent pas : une couleur ou un numéro édité en direct les laisse inchangés.
+        """
+        return self.data_version is not None and self.data_version == str(version)
+
+# Instantané ouvert par fichier : (inode, mtime) -> Snapshot
+_cache = {}
+
+def open_snapshot(channel=None):
+    """Instantané courant du canal (rouvert seulement si le fichier a été remplacé), ou None"""
+    path = partition_path(SNAPSHOT_FILE, channel)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (st.st_ino, st.st_mtime_ns)
+    cached = _cache.get(path)
+    if cached is None or cached[0] != key:
+        try:
+            cached = _cache[path] = (key, Snapshot(path))
+        except (OSError, ValueError):
+            return None
+    return cached[1]
@@ -1,75 +1,525 @@
 import json
+import logging
 import os
+import shutil
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from functools import wraps
 from datetime import datetime
-from config import PREDICTIONS_FILE, LAST_SYNC_FILE, ensure_data_dir
+from compression import pack_json, unpack_json
+from normalize import (
+    normalize_couleur, normalize_statut, normalize_filters, make_prediction, COLUMNS, UPDATABLE, EN_ATTENTE
+)
+from aggregates import empty_aggregates, add_to_aggregates, summarize
+from metrics import timed, STORAGE_SECONDS
+from config import (
+    PREDICTIONS_FILE, PREDICTIONS_LOG_FILE, LAST_SYNC_FILE, STATS_FILE, ARCHIVE_DIR,
+    COMPACT_THRESHOLD, HOT_MONTHS, STORAGE_BACKEND, ITER_PAGE_SIZE, DEFAULT_CHANNEL, partition_path, ensure_data_dir
+)
+
+logger = logging.getLogger(__name__)
 
 # Créer le dossier au chargement
 ensure_data_dir()
 
+# Cache mémoire par canal, découpé par mois (AAAA-MM de la date du message) :
+# - predictions.json : mois ouverts (les HOT_MONTHS derniers) + manifeste des mois clos
+# - archive/<canal>/AAAA-MM.rows.z : mois clos, JSON compressé, lu à la demande ; seule une
+#   écriture le garde en mémoire (jusqu'à la compaction), les lectures le relâchent aussitôt
+# - archive/<canal>/AAAA-MM.raw.z : raw_text du mois, jamais lu par les stats ni les rapports
+# - archive/<canal>/ids.z : ids de chaque mois clos, pour reconnaître un doublon sans charger
+#   le mois (les anciennes lignes sont datées du scraping, pas du message)
+# - journal append-only rejoué au démarrage, vidé à chaque compaction
+class _Partition:
+    def __init__(self, channel):
+        self.predictions_file = partition_path(PREDICTIONS_FILE, channel)
+        self.log_file = partition_path(PREDICTIONS_LOG_FILE, channel)
+        self.stats_file = partition_path(STATS_FILE, channel)
+        self.last_sync_file = partition_path(LAST_SYNC_FILE, channel)
+        self.archive_dir = os.path.join(ARCHIVE_DIR, channel)
+        self.months = None  # mois chargé -> lignes
+        self.by_id = {}
+        self.closed = {}  # mois archivé -> nombre de lignes
+        self.closed_ids = None  # mois archivé -> ids triés, chargé à la première écriture
+        self.dirty = set()  # mois modifiés depuis la dernière compaction
+        self.log_lines = 0
+        self.aggregates = None
+
+_partitions = {}
+
+def _partition(channel=None):
+    channel = channel or DEFAULT_CHANNEL
+    if channel not in _partitions:
+        _partitions[channel] = _Partition(channel)
+    return _partitions[channel]
+
+# L'écriture du pipeline de sync tourne dans un thread, l'écoute dans la boucle
+_lock = threading.RLock()
+
+def _locked(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _lock:
+            return func(*args, **kwargs)
+    return wrapper
+
 def load_json(filepath, default=None):
     if not os.path.exists(filepath):
         return default if default is not None else {}
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return json.load(f)
-    except:
+    except (OSError, ValueError) as e:
+        # Fichier illisible : mis de côté plutôt qu'écrasé par la prochaine écriture
+        logger.error(f"{filepath} illisible ({e}), copie conservée en .corrupt")
+        try:
+            os.replace(filepath, filepath + '.corrupt')
+        except OSError:
+            pass
         return default if default is not None else {}
 
 def save_json(filepath, data):
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    """Écriture atomique : fichier temporaire + fsync + os.replace"""
+    tmp = f"{filepath}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        # Encodage compact : pas d'indentation ni d'espaces superflus
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'), default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filepath)
 
-def add_prediction(message_id, numero, couleur, statut, raw_text):
-    predictions = load_json(PREDICTIONS_FILE, [])
-    
-    if any(p['message_id'] == message_id for p in predictions):
-        return False
-    
-    predictions.append({
-        'message_id': message_id,
-        'numero': numero,
-        'couleur': couleur,
-        'statut': statut,
-        'raw_text': raw_text,
-        'date': datetime.now().isoformat()
-    })
-    
-    save_json(PREDICTIONS_FILE, predictions)
-    return True
+def _load_z(filepath, default):
+    """Fichier JSON compressé de l'archive (même traitement d'erreur que load_json)"""
+    if not os.path.exists(filepath):
+        return default
+    try:
+        with open(filepath, 'rb') as f:
+            return unpack_json(f.read())
+    except (OSError, ValueError, zlib.error) as e:
+        logger.error(f"{filepath} illisible ({e}), copie conservée en .corrupt")
+        try:
+            os.replace(filepath, filepath + '.corrupt')
+        except OSError:
+            pass
+        return default
+
+def _save_z(filepath, data):
+    """Écriture atomique d'un fichier JSON compressé"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp = f"{filepath}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(pack_json(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filepath)
+
+def _month(p):
+    return str(p['date'])[:7]
+
+def _hot_from():
+    """Premier mois encore ouvert (AAAA-MM) : les HOT_MONTHS derniers, mois courant compris"""
+    now = datetime.now()
+    index = now.year * 12 + now.month - HOT_MONTHS
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
 
-def get_predictions(filters=None):
-    predictions = load_json(PREDICTIONS_FILE, [])
+def _rows_file(part, month):
+    return os.path.join(part.archive_dir, f"{month}.rows.z")
+
+def _raw_file(part, month):
+    return os.path.join(part.archive_dir, f"{month}.raw.z")
+
+def _month_rows(part, month):
+    """Lignes d'un mois à modifier, chargées depuis l'archive et gardées jusqu'à la compaction"""
+    rows = part.months.get(month)
+    if rows is None:
+        rows = part.months[month] = _load_z(_rows_file(part, month), []) if month in part.closed else []
+        for p in rows:
+            part.by_id[p['message_id']] = p
+    return rows
+
+def _ids_file(part):
+    return os.path.join(part.archive_dir, 'ids.z')
+
+def _closed_ids(part):
+    """Index mois archivé -> ids triés (array int64)"""
+    if part.closed_ids is None:
+        stored = _load_z(_ids_file(part), None)
+        if stored is None or set(stored) != set(part.closed):
+            # Archive d'avant l'index, ou arrêt en pleine compaction : reconstruit une fois
+            stored = {
+                month: sorted(p['message_id'] for p in _load_z(_rows_file(part, month), []))
+                for month in part.closed
+            }
+            if stored:
+                _save_z(_ids_file(part), stored)
+        part.closed_ids = {month: array('q', ids) for month, ids in stored.items()}
+    return part.closed_ids
+
+def _find_month(part, message_id):
+    """Mois où un id est déjà rangé (en mémoire ou archivé), None s'il est inconnu"""
+    p = part.by_id.get(message_id)
+    if p is not None:
+        return _month(p)
+    for month, ids in _closed_ids(part).items():
+        if month in part.months:
+            continue  # déjà couvert par by_id
+        i = bisect_left(ids, message_id)
+        if i < len(ids) and ids[i] == message_id:
+            return month
+    return None
+
+def _scan_rows(part, month):
+    """Lignes d'un mois en lecture seule : un mois archivé est lu sans rester en mémoire"""
+    rows = part.months.get(month)
+    if rows is not None:
+        return rows
+    return _load_z(_rows_file(part, month), []) if month in part.closed else []
+
+@_locked
+def _load(channel=None):
+    """Charge les mois ouverts puis rejoue le journal (une seule fois par process)"""
+    part = _partition(channel)
+    if part.months is not None:
+        return part
     
-    if not filters:
-        return predictions
+    data = load_json(part.predictions_file, [])
+    # Ancien format (liste complète) : découpé par mois à la prochaine compaction
+    rows = data if isinstance(data, list) else data.get('rows', [])
+    part.months, part.by_id, part.dirty, part.log_lines = {}, {}, set(), 0
+    part.closed = {} if isinstance(data, list) else data.get('closed', {})
+    part.closed_ids = None
+    for p in rows:
+        month_rows = _month_rows(part, _month(p))
+        if p['message_id'] not in part.by_id:
+            part.by_id[p['message_id']] = p
+            month_rows.append(p)
+    if isinstance(data, list) and rows:
+        part.dirty.update(part.months)
     
+    if os.path.exists(part.log_file):
+        with open(part.log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    p = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    continue
+                part.log_lines += 1
+                month = _month(p)
+                month_rows = _month_rows(part, month)
+                part.dirty.add(month)
+                if p['message_id'] in part.by_id:
+                    # Version plus récente (statut édité)
+                    part.by_id[p['message_id']].update(p)
+                    continue
+                part.by_id[p['message_id']] = p
+                month_rows.append(p)
+    return part
+
+def _count(part):
+    """Nombre de lignes sans charger les mois archivés"""
+    return (sum(len(rows) for rows in part.months.values())
+            + sum(n for month, n in part.closed.items() if month not in part.months))
+
+@_locked
+def _select(filters=None, channel=None):
+    """Lignes retenues par les filtres, en ne chargeant que les mois concernés (sans raw_text froid)"""
+    part = _load(channel)
+    f = normalize_filters(filters)
     result = []
-    for p in predictions:
-        match = True
-        if filters.get('couleur'):
-            if filters['couleur'].lower() not in p['couleur'].lower():
-                match = False
-        if filters.get('statut'):
-            if filters['statut'].lower() not in p['statut'].lower():
-                match = False
-        if match:
+    for month in sorted(set(part.months) | set(part.closed)):
+        # Mois hors de la plage de dates : ni chargé ni parcouru
+        if month < f.get('date_from', '')[:7] or f"{month}-01" >= f.get('date_to', '9999'):
+            continue
+        for p in _scan_rows(part, month):
+            if 'couleur_norm' in f and p.get('couleur_norm', normalize_couleur(p['couleur'])) != f['couleur_norm']:
+                continue
+            if 'outcome' in f and p.get('outcome', normalize_statut(p['statut'])) != f['outcome']:
+                continue
+            if 'numero' in f and str(p['numero']) != f['numero']:
+                continue
+            if 'date_from' in f and p['date'] < f['date_from']:
+                continue
+            if 'date_to' in f and p['date'] >= f['date_to']:
+                continue
             result.append(p)
     return result
 
-def get_stats():
-    predictions = load_json(PREDICTIONS_FILE, [])
-    return {'total': len(predictions)}
+def _raw_texts(part, rows):
+    """message_id -> raw_text pour ces lignes, lu dans l'archive froide des mois concernés"""
+    texts = {}
+    for month in {_month(p) for p in rows if 'raw_text' not in p}:
+        texts.update((int(k), v) for k, v in _load_z(_raw_file(part, month), {}).items())
+    return {p['message_id']: p['raw_text'] if 'raw_text' in p else texts.get(p['message_id']) for p in rows}
 
-def get_last_sync():
-    return load_json(LAST_SYNC_FILE, {'last_message_id': 0})
+def _track_pending(agg, p):
+    """ids encore en attente, tenus à jour avec les agrégats (réconciliation sans parcours)"""
+    key = str(p['message_id'])
+    if (p.get('outcome') or normalize_statut(p['statut'])) == EN_ATTENTE:
+        agg['pending'][key] = 1
+    else:
+        agg['pending'].pop(key, None)
 
-def update_last_sync(message_id):
-    save_json(LAST_SYNC_FILE, {
-        'last_message_id': message_id,
-        'sync_date': datetime.now().isoformat()
-    })
+@_locked
+def _load_aggregates(channel=None):
+    """Agrégats persistés dans stats.json (reconstruits une fois si absents)"""
+    part = _load(channel)
+    if part.aggregates is None:
+        agg = load_json(part.stats_file, None)
+        # Reconstruits aussi si désynchronisés après un arrêt brutal, ou d'avant les ids en attente
+        if not agg or 'pending' not in agg or summarize(agg)['total'] != _count(part):
+            agg = {**empty_aggregates(), 'pending': {}}
+            for p in _select(channel=channel):
+                add_to_aggregates(agg, p)
+                _track_pending(agg, p)
+            save_json(part.stats_file, agg)
+        part.aggregates = agg
+    return part.aggregates
 
-def clear_all():
-    save_json(PREDICTIONS_FILE, [])
-    save_json(LAST_SYNC_FILE, {'last_message_id': 0})
+@_locked
+def compact(channel=None):
+    """Range chaque mois à sa place, sort raw_text vers l'archive froide et vide le journal.
+
+    Les mois clos modifiés sont réécrits compressés puis libérés de la mémoire.
+    """
+    part = _load(channel)
+    hot_from = _hot_from()
+    index = _closed_ids(part)
+    hot = []
+    for month, rows in sorted(part.months.items()):
+        texts = {str(p['message_id']): p.pop('raw_text') for p in rows if 'raw_text' in p}
+        if texts:
+            raw_file = _raw_file(part, month)
+            _save_z(raw_file, {**_load_z(raw_file, {}), **texts})
+        if month >= hot_from:
+            hot.extend(rows)
+        elif month in part.dirty or month not in part.closed:
+            _save_z(_rows_file(part, month), rows)
+            part.closed[month] = len(rows)
+            index[month] = array('q', sorted(p['message_id'] for p in rows))
     
+    if index:
+        _save_z(_ids_file(part), {month: ids.tolist() for month, ids in index.items()})
+    save_json(part.predictions_file, {'closed': part.closed, 'rows': hot})
+    if os.path.exists(part.log_file):
+        os.remove(part.log_file)
+    part.log_lines = 0
+    part.dirty = set()
+    for month in [m for m in part.months if m < hot_from]:
+        for p in part.months.pop(month):
+            del part.by_id[p['message_id']]
+
+# Champs comparés pour décider d'une mise à jour (raw_text peut être dans l'archive froide)
+COMPARED = ('numero', 'couleur', 'statut')
+
+def _append_log(records, agg, channel=None):
+    """Un seul append pour le lot, puis stats et compaction éventuelle"""
+    part = _partition(channel)
+    with open(part.log_file, 'a', encoding='utf-8') as f:
+        f.write(''.join(
+            json.dumps(p, ensure_ascii=False, default=str) + '\n' for p in records
+        ))
+    part.log_lines += len(records)
+    part.dirty.update(_month(p) for p in records)
+    save_json(part.stats_file, agg)
+    
+    if part.log_lines >= COMPACT_THRESHOLD:
+        compact(channel)
+
+@_locked
+def add_predictions(records, channel=None):
+    """Ajoute un lot de prédictions en un seul append. Retourne le nombre ajouté."""
+    part = _load(channel)
+    agg = _load_aggregates(channel)
+    
+    new = []
+    for p in records:
+        # Doublon reconnu par l'index, quel que soit son mois : aucun mois archivé chargé pour rien
+        if _find_month(part, p['message_id']) is not None:
+            continue
+        month_rows = _month_rows(part, _month(p))
+        # Copie : la compaction retire raw_text des lignes gardées en mémoire
+        p = dict(p)
+        part.by_id[p['message_id']] = p
+        month_rows.append(p)
+        new.append(p)
+        add_to_aggregates(agg, p)
+        _track_pending(agg, p)
+    
+    if not new:
+        return 0
+    
+    _append_log(new, agg, channel)
+    return len(new)
+
+@_locked
+def upsert_predictions(records, channel=None):
+    """Ajoute ou met à jour (statut édité). Retourne le nombre de lignes modifiées."""
+    part = _load(channel)
+    agg = _load_aggregates(channel)
+    
+    changed = []
+    for p in records:
+        # Une ligne existante reste dans son mois, même si la date du message diffère
+        month = _find_month(part, p['message_id'])
+        if month is None:
+            p = dict(p)
+            part.by_id[p['message_id']] = p
+            _month_rows(part, _month(p)).append(p)
+            add_to_aggregates(agg, p)
+            _track_pending(agg, p)
+            changed.append(p)
+            continue
+        old = part.by_id.get(p['message_id'])
+        if old is None:
+            # Mois archivé : comparé en lecture seule, gardé en mémoire seulement s'il change
+            old = next(r for r in _scan_rows(part, month) if r['message_id'] == p['message_id'])
+            if all(old.get(k) == p.get(k) for k in COMPARED):
+                continue
+            _month_rows(part, month)
+            old = part.by_id[p['message_id']]
+        if any(old.get(k) != p.get(k) for k in COMPARED):
+            add_to_aggregates(agg, old, -1)
+            for k in UPDATABLE:
+                old[k] = p[k]
+            add_to_aggregates(agg, old)
+            _track_pending(agg, old)
+            changed.append(old)
+    
+    if changed:
+        _append_log(changed, agg, channel)
+    return len(changed)
+
+def add_prediction(message_id, numero, couleur, statut, raw_text, date=None, channel=None):
+    return add_predictions([
+        make_prediction(message_id, numero, couleur, statut, raw_text, date)
+    ], channel=channel) == 1
+
+@_locked
+def get_predictions(filters=None, channel=None):
+    """Lignes complètes, raw_text compris (lu dans l'archive froide si besoin)"""
+    rows = _select(filters, channel)
+    texts = _raw_texts(_partition(channel), rows)
+    return [{**p, 'raw_text': texts[p['message_id']]} for p in rows]
+
+def _value(p, column):
+    if column == 'couleur_norm':
+        return p.get('couleur_norm') or normalize_couleur(p['couleur'])
+    if column == 'outcome':
+        return p.get('outcome') or normalize_statut(p['statut'])
+    return p[column]
+
+@_locked
+def _sorted_rows(filters, columns, channel, descending=False):
+    """Lignes triées par message_id, raw_text ajouté seulement s'il est demandé"""
+    rows = sorted(_select(filters, channel), key=lambda p: p['message_id'], reverse=descending)
+    if 'raw_text' in columns:
+        texts = _raw_texts(_partition(channel), rows)
+        rows = [{**p, 'raw_text': texts[p['message_id']]} for p in rows]
+    return rows
+
+def get_columns(columns, filters=None, channel=None):
+    """Colonnes demandées en listes parallèles, triées par message_id croissant"""
+    predictions = _sorted_rows(filters, columns, channel)
+    return {c: [_value(p, c) for p in predictions] for c in columns}
+
+def iter_predictions(filters=None, columns=None, after_id=None, limit=None, descending=True,
+                     page_size=ITER_PAGE_SIZE, channel=None):
+    """Parcourt les prédictions triées par message_id, réduites aux colonnes demandées.
+
+    Même interface que database.iter_predictions (keyset `after_id`, `limit`) ;
+    ici les données sont déjà en mémoire, `page_size` est ignoré.
+    """
+    columns = tuple(columns or COLUMNS)
+    if any(c not in COLUMNS for c in columns):
+        raise ValueError(f"Colonne inconnue: {columns}")
+    predictions = _sorted_rows(filters, columns, channel, descending=descending)
+    count = 0
+    for p in predictions:
+        if after_id is not None and (p['message_id'] >= after_id if descending else p['message_id'] <= after_id):
+            continue
+        if limit is not None and count >= limit:
+            return
+        count += 1
+        yield {c: _value(p, c) for c in columns}
+
+def count_predictions(filters=None, channel=None):
+    """Nombre de prédictions filtrées"""
+    if not filters:
+        return _count(_load(channel))
+    return len(_select(filters, channel))
+
+def get_stats(channel=None):
+    return summarize(_load_aggregates(channel))
+
+@_locked
+def pending_ids(limit=None, channel=None):
+    """ids des prédictions en attente, les plus récentes d'abord (suivis à l'ingestion)"""
+    return sorted(map(int, _load_aggregates(channel)['pending']), reverse=True)[:limit]
+
+def get_last_sync(channel=None):
+    return load_json(_partition(channel).last_sync_file, {'last_message_id': 0})
+
+@_locked
+def data_version(channel=None):
+    """Marqueur d'écriture du canal, différent après chaque ajout, mise à jour ou effacement.
+
+    Chaque écriture allonge le journal ; la compaction et l'effacement
+    réécrivent predictions.json.
+    """
+    part = _partition(channel)
+    marker = []
+    for path in (part.predictions_file, part.log_file):
+        try:
+            st = os.stat(path)
+            marker.append(f"{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            marker.append('-')
+    return '/'.join(marker)
+
+def update_last_sync(message_id, oldest_message_id=None, backfill_done=None, channel=None):
+    """Point de contrôle : plus haut id traité, et pour /fullsync le plus bas"""
+    state = get_last_sync(channel)
+    state['last_message_id'] = message_id
+    state['sync_date'] = datetime.now().isoformat()
+    if oldest_message_id is not None:
+        state['oldest_message_id'] = oldest_message_id
+    if backfill_done is not None:
+        state['backfill_done'] = backfill_done
+    save_json(_partition(channel).last_sync_file, state)
+
+@_locked
+def clear_all(channel=None):
+    part = _partition(channel)
+    part.months, part.by_id, part.closed, part.dirty, part.log_lines = {}, {}, {}, set(), 0
+    part.closed_ids = {}
+    part.aggregates = {**empty_aggregates(), 'pending': {}}
+    shutil.rmtree(part.archive_dir, ignore_errors=True)
+    save_json(part.predictions_file, {'closed': {}, 'rows': []})
+    save_json(part.stats_file, part.aggregates)
+    if os.path.exists(part.log_file):
+        os.remove(part.log_file)
+    save_json(part.last_sync_file, {'last_message_id': 0})
+
+# Backend SQLite : mêmes fonctions, servies par database.py
+if STORAGE_BACKEND == 'sqlite':
+    from database import (
+        add_prediction, add_predictions, upsert_predictions, get_predictions, get_columns, get_stats,
+        iter_predictions, count_predictions, get_last_sync, update_last_sync, clear_all, compact,
+        data_version, pending_ids
+    )
+
+# Latences exposées sur /metrics, quel que soit le backend
+add_prediction = timed(STORAGE_SECONDS, op='add_prediction')(add_prediction)
+add_predictions = timed(STORAGE_SECONDS, op='add_predictions')(add_predictions)
+upsert_predictions = timed(STORAGE_SECONDS, op='upsert_predictions')(upsert_predictions)
+get_predictions = timed(STORAGE_SECONDS, op='get_predictions')(get_predictions)
+get_columns = timed(STORAGE_SECONDS, op='get_columns')(get_columns)
+get_stats = timed(STORAGE_SECONDS, op='get_stats')(get_stats)
+count_predictions = timed(STORAGE_SECONDS, op='count_predictions')(count_predictions)
+clear_all = timed(STORAGE_SECONDS, op='clear_all')(clear_all)
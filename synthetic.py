@@ -0,0 +1,87 @@
+"""Canal synthétique pour les benchmarks (aucun accès réseau).
+
+generate_messages(n) produit des messages au format réel du canal
+(PRÉDICTION #N / Couleur: / Statut:) mêlés à des annonces, et
+FakeChannel remplace le client Telethon (iter_messages, get_messages).
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+COULEURS = ['♥️ Cœur', '♠️ Pique', '♦️ Carreau', '♣️ Trèfle']
+STATUTS = ['✅ GAGNÉ', '❌ PERDU', '⏳ En attente']
+ANNONCES = [
+    "🔥 Bonjour à tous ! Les prédictions reprennent à 14h. Restez connectés 🔥",
+    "📢 Rappel : rejoignez le VIP pour plus de signaux.\n" * 8,
+    "✅✅✅ Encore un gain ! Merci à tous ✅✅✅",
+    "Résultats de la journée :\n" + "Jeu terminé, bonne soirée à tous.\n" * 20,
+]
+
+class FakeMessage:
+    __slots__ = ('id', 'date', 'text')
+    
+    def __init__(self, id, date, text):
+        self.id = id
+        self.date = date
+        self.text = text
+
+def prediction_text(numero, couleur, statut):
+    return f"🎯 PRÉDICTION #{numero}\n🎨 Couleur: {couleur}\n📊 Statut: {statut}"
+
+def generate_messages(n, prediction_ratio=0.7, seed=42):
+    """n messages d'ids 1..n, environ un toutes les 5 minutes"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    messages = []
+    for i in range(1, n + 1):
+        date = start + timedelta(minutes=5 * i)
+        if rng.random() < prediction_ratio:
+            text = prediction_text(
+                rng.randint(1, 1440), rng.choice(COULEURS),
+                rng.choices(STATUTS, weights=(45, 45, 10))[0]
+            )
+        else:
+            text = rng.choice(ANNONCES)
+        messages.append(FakeMessage(i, date, text))
+    return messages
+
+class FakeChannel:
+    """Remplace TelegramClient pour Scraper.sync (mêmes paramètres d'iter_messages)"""
+    
+    def __init__(self, messages, latency=0.0, page_size=100):
+        self.messages = messages
+        self.by_id = {m.id: m for m in messages}
+        self.latency = latency
+        self.page_size = page_size
+    
+    def is_connected(self):
+        return True
+    
+    async def connect(self):
+        pass
+    
+    async def disconnect(self):
+        pass
+    
+    async def is_user_authorized(self):
+        return True
+    
+    def iter_messages(self, entity, limit=None, offset_id=0, min_id=0, reverse=False, wait_time=None):
+        async def iterate():
+            if reverse:
+                selected = [m for m in self.messages if m.id > min_id]
+            else:
+                selected = [m for m in reversed(self.messages) if not offset_id or m.id < offset_id]
+            if limit is not None:
+                selected = selected[:limit]
+            for i, message in enumerate(selected):
+                # Une « requête » réseau simulée par page de 100 messages
+                if self.latency and i % self.page_size == 0:
+                    await asyncio.sleep(self.latency)
+                yield message
+        return iterate()
+    
+    async def get_messages(self, entity, ids=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self.by_id.get(i) for i in ids]
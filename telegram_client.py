@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import logging
+import time
+from config import (
+    API_ID, API_HASH, SESSION_PATH, CHANNELS, DEFAULT_CHANNEL, CHANNEL_CACHE_FILE, SYNC_WAIT_TIME,
+    partition_path
+)
+
+logger = logging.getLogger(__name__)
+
+# Un seul client Telethon pour le scraper, l'écoute et l'authentification.
+# Telethon n'est importé qu'au premier usage : le démarrage (et /health) n'en dépend pas.
+_client = None
+_channels = {}
+
+class RateLimiter:
+    """Espacement minimal entre requêtes d'historique, partagé par tous les canaux"""
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = None
+    
+    async def wait(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self._next, time.monotonic()) + self.interval
+    
+    def pause(self, seconds):
+        """FloodWait : plus aucune requête, sur aucun canal, avant `seconds`"""
+        self._next = max(self._next, time.monotonic() + seconds)
+
+history_limiter = RateLimiter(SYNC_WAIT_TIME)
+
+def get_client():
+    """Client partagé, construit au premier usage"""
+    global _client
+    if _client is None:
+        from telethon import TelegramClient
+        _client = TelegramClient(SESSION_PATH, API_ID, API_HASH)
+    return _client
+
+def is_connected():
+    """État de la connexion MTProto, sans construire le client"""
+    return _client is not None and _client.is_connected()
+
+async def ensure_connected():
+    client = get_client()
+    if not client.is_connected():
+        await client.connect()
+    return client
+
+async def reconnect():
+    """Coupe et rouvre la connexion MTProto après une erreur réseau"""
+    client = get_client()
+    try:
+        await client.disconnect()
+    except Exception:
+        pass
+    await client.connect()
+    logger.info("Client Telegram reconnecté")
+    return client
+
+async def get_channel(channel=None):
+    """InputPeer du canal : résolu une fois par son id puis mis en cache disque"""
+    channel = channel or DEFAULT_CHANNEL
+    if channel in _channels:
+        return _channels[channel]
+    
+    from telethon.tl.types import InputPeerChannel
+    peer_id = CHANNELS[channel]['id']
+    cache_file = partition_path(CHANNEL_CACHE_FILE, channel)
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r') as f:
+            cached = json.load(f)
+        if cached.get('peer_id') == peer_id:
+            _channels[channel] = InputPeerChannel(cached['channel_id'], cached['access_hash'])
+            return _channels[channel]
+    
+    client = await ensure_connected()
+    try:
+        peer = await client.get_input_entity(peer_id)
+    except ValueError:
+        # Entité absente du cache de session : charger les dialogues une fois
+        await client.get_dialogs()
+        peer = await client.get_input_entity(peer_id)
+    
+    if not isinstance(peer, InputPeerChannel):
+        raise ValueError(f"{peer_id} n'est pas un canal")
+    
+    with open(cache_file, 'w') as f:
+        json.dump({
+            'peer_id': peer_id,
+            'channel_id': peer.channel_id,
+            'access_hash': peer.access_hash
+        }, f)
+    _channels[channel] = peer
+    return peer
+
+async def reset():
+    """Ferme le client et oublie les canaux (nouvelle session)"""
+    global _client
+    if _client is not None:
+        await _client.disconnect()
+    _client = None
+    _channels.clear()
+    for channel in CHANNELS:
+        cache_file = partition_path(CHANNEL_CACHE_FILE, channel)
+        if os.path.exists(cache_file):
+            os.remove(cache_file)